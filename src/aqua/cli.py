@@ -1,7 +1,6 @@
 """Command-line interface for Aqua."""
 
 import functools
-import json
 import os
 import sys
 from datetime import datetime
@@ -18,21 +17,18 @@ from aqua.coordinator import Coordinator
 from aqua.db import get_db, init_db
 from aqua.models import Agent, AgentStatus, AgentType, Task, TaskStatus
 from aqua.utils import (
+    batch_now,
     format_time_ago,
+    format_times_ago,
     generate_agent_name,
     generate_short_id,
     get_current_pid,
+    json_dumps,
     process_exists,
     truncate,
-    utc_now,
+    utc_now_naive,
 )
 
-
-def _utc_now_naive():
-    """Get current UTC time as naive datetime for comparisons with DB values."""
-    return utc_now().replace(tzinfo=None)
-
-
 console = Console()
 
 # Environment variable for storing agent ID (persists across commands in same shell)
@@ -176,10 +172,7 @@ def output_json(data: dict, nl: bool = False) -> None:
         data: Dictionary to output
         nl: If True, output as newline-delimited JSON (no indent, one line)
     """
-    if nl:
-        click.echo(json.dumps(data, default=str))
-    else:
-        click.echo(json.dumps(data, indent=2, default=str))
+    click.echo(json_dumps(data, indent=not nl, default=str))
 
 
 def should_output_json(as_json: bool) -> bool:
@@ -281,7 +274,7 @@ def status(as_json: bool):
                 from datetime import timedelta
 
                 from aqua.coordinator import AGENT_DEAD_THRESHOLD_SECONDS
-                heartbeat_age = _utc_now_naive() - leader_agent.last_heartbeat_at
+                heartbeat_age = utc_now_naive() - leader_agent.last_heartbeat_at
                 is_alive = heartbeat_age < timedelta(seconds=AGENT_DEAD_THRESHOLD_SECONDS)
                 if is_alive:
                     status_str = f"[green]active[/green], term {leader.term}"
@@ -305,11 +298,11 @@ def status(as_json: bool):
             table.add_column("Task")
             table.add_column("Heartbeat")
 
-            for agent in active_agents:
+            heartbeats = format_times_ago(a.last_heartbeat_at for a in active_agents)
+            for agent, hb_str in zip(active_agents, heartbeats):
                 is_leader = leader and leader.agent_id == agent.id
                 name = f"[bold]{agent.name}[/bold] ★" if is_leader else agent.name
                 task_str = agent.current_task_id[:8] if agent.current_task_id else "-"
-                hb_str = format_time_ago(agent.last_heartbeat_at)
 
                 table.add_row(
                     name,
@@ -556,24 +549,30 @@ def serialize(every: int, dry_run: bool, as_json: bool):
             return
 
         # Actually make the changes
-        # 1. Update task dependencies
-        for task_id, new_deps in tasks_to_update:
-            now = _utc_now_naive().isoformat()
-            db.conn.execute(
+        # One clock read stamps the dependency updates and the checkpoints
+        with db.transaction() as conn, batch_now() as pinned:
+            # 1. Update task dependencies
+            now = pinned.isoformat()
+            conn.executemany(
                 "UPDATE tasks SET depends_on = ?, updated_at = ? WHERE id = ?",
-                (json.dumps(new_deps), now, task_id)
+                [
+                    (json_dumps(new_deps) if new_deps else None, now, task_id)
+                    for task_id, new_deps in tasks_to_update
+                ]
             )
 
-        # 2. Create checkpoint tasks
-        for cp in checkpoints_to_create:
-            checkpoint_task = Task(
-                id=cp["id"],
-                title=cp["title"],
-                tags=[CHECKPOINT_TAG],
-                depends_on=cp["depends_on"],
-                priority=5,  # Default priority for checkpoints
-            )
-            db.create_task(checkpoint_task)
+            # 2. Create checkpoint tasks
+            checkpoints = [
+                Task(
+                    id=cp["id"],
+                    title=cp["title"],
+                    tags=[CHECKPOINT_TAG],
+                    depends_on=cp["depends_on"],
+                    priority=5,  # Default priority for checkpoints
+                )
+                for cp in checkpoints_to_create
+            ]
+            db.create_tasks_bulk(checkpoints)
 
         # Output result
         result = {
@@ -1410,10 +1409,10 @@ def inbox(unread: bool, as_json: bool):
         if message_ids:
             db.mark_messages_read(agent_id, message_ids)
 
-        for msg in messages:
+        times = format_times_ago(m.created_at for m in messages)
+        for msg, time_str in zip(messages, times):
             from_agent = db.get_agent(msg.from_agent)
             from_name = from_agent.name if from_agent else msg.from_agent[:8]
-            time_str = format_time_ago(msg.created_at)
             to_str = f" → {msg.to_agent}" if msg.to_agent else " (broadcast)"
 
             console.print(f"[dim]{time_str}[/dim] [cyan]{from_name}[/cyan]{to_str}:")
@@ -1754,11 +1753,11 @@ def watch(refresh: int):
             table.add_column("Tasks", style="yellow")
 
             agents_text = ""
-            for agent in agents:
+            heartbeats = format_times_ago(a.last_heartbeat_at for a in agents)
+            for agent, hb in zip(agents, heartbeats):
                 is_leader = leader and leader.agent_id == agent.id
                 marker = "★ " if is_leader else "  "
                 status = "working" if agent.current_task_id else "idle"
-                hb = format_time_ago(agent.last_heartbeat_at)
                 agents_text += f"{marker}{agent.name} [{status}] ({hb})\n"
 
             if not agents_text:
@@ -1824,7 +1823,8 @@ def doctor(as_json: bool, fix: bool):
 
         # Schema check
         try:
-            db.conn.execute("SELECT * FROM schema_version")
+            if not db.conn.execute("PRAGMA user_version").fetchone()[0]:
+                raise RuntimeError("schema not initialized")
             checks["schema"] = "ok"
             if not as_json:
                 console.print("[green]✓[/green] Schema initialized")
@@ -1844,7 +1844,7 @@ def doctor(as_json: bool, fix: bool):
             leader_agent = db.get_agent(leader.agent_id)
             if leader_agent:
                 # Check leader agent's heartbeat
-                heartbeat_age = _utc_now_naive() - leader_agent.last_heartbeat_at
+                heartbeat_age = utc_now_naive() - leader_agent.last_heartbeat_at
                 is_alive = heartbeat_age < timedelta(seconds=AGENT_DEAD_THRESHOLD_SECONDS)
                 if is_alive:
                     checks["leader"] = "ok"
@@ -1868,7 +1868,7 @@ def doctor(as_json: bool, fix: bool):
         # Agent heartbeat check
         agents = db.get_all_agents(status=AgentStatus.ACTIVE)
         stale_agents = []
-        threshold = _utc_now_naive() - timedelta(seconds=60)
+        threshold = utc_now_naive() - timedelta(seconds=60)
 
         for agent in agents:
             if agent.last_heartbeat_at < threshold:
@@ -1891,7 +1891,7 @@ def doctor(as_json: bool, fix: bool):
         # Stuck tasks check
         tasks = db.get_all_tasks(status=TaskStatus.CLAIMED)
         stuck_tasks = []
-        claim_threshold = _utc_now_naive() - timedelta(minutes=30)
+        claim_threshold = utc_now_naive() - timedelta(minutes=30)
 
         for task in tasks:
             if task.claimed_at and task.claimed_at < claim_threshold:
@@ -2030,7 +2030,9 @@ def log(agent: str, task_id: str, limit: int, as_json: bool):
             if agent_obj:
                 agent_id = agent_obj.id
 
-        events = db.get_events(agent_id=agent_id, task_id=task_id, limit=limit)
+        events = db.get_events(
+            agent_id=agent_id, task_id=task_id, limit=limit, include_archived=True
+        )
 
         if as_json:
             output_json([e.to_dict() for e in events])
@@ -1,20 +1,17 @@
 """Coordinator logic for task management and crash recovery."""
 
+import sqlite3
 from datetime import timedelta
 
 from aqua.db import Database
 from aqua.models import Agent, AgentStatus, Task, TaskStatus
-from aqua.utils import process_exists, utc_now
-
-
-def _utc_now_naive():
-    """Get current UTC time as naive datetime for comparisons with DB values."""
-    return utc_now().replace(tzinfo=None)
+from aqua.utils import live_pids, utc_now_naive
 
 # Configuration defaults
 # 5 minutes - LLM operations can take several minutes
 AGENT_DEAD_THRESHOLD_SECONDS = 300
 TASK_CLAIM_TIMEOUT_SECONDS = 1800  # 30 minutes for complex tasks
+EVENT_RETENTION_DAYS = 30  # Older events move to monthly archive files
 
 
 class Coordinator:
@@ -25,10 +22,12 @@ class Coordinator:
         db: Database,
         dead_threshold: int = AGENT_DEAD_THRESHOLD_SECONDS,
         claim_timeout: int = TASK_CLAIM_TIMEOUT_SECONDS,
+        event_retention_days: int = EVENT_RETENTION_DAYS,
     ):
         self.db = db
         self.dead_threshold = timedelta(seconds=dead_threshold)
         self.claim_timeout = timedelta(seconds=claim_timeout)
+        self.event_retention = timedelta(days=event_retention_days)
 
     def claim_next_task(self, agent_id: str) -> Task | None:
         """
@@ -46,7 +45,7 @@ class Coordinator:
         # Attempt atomic claim
         if self.db.claim_task(task.id, agent_id, term):
             # Update agent's current task
-            self.db.update_agent_task(agent_id, task.id)
+            self.db.touch_agent(agent_id, current_task_id=task.id)
             # Refresh task data
             return self.db.get_task(task.id)
 
@@ -76,7 +75,7 @@ class Coordinator:
         # Attempt atomic claim
         if self.db.claim_task(task.id, agent_id, term):
             # Update agent's current task
-            self.db.update_agent_task(agent_id, task.id)
+            self.db.touch_agent(agent_id, current_task_id=task.id)
             # Refresh task data
             return (self.db.get_task(task.id), is_match)
 
@@ -90,7 +89,7 @@ class Coordinator:
         term = self.db.get_current_term()
 
         if self.db.claim_task(task_id, agent_id, term):
-            self.db.update_agent_task(agent_id, task_id)
+            self.db.touch_agent(agent_id, current_task_id=task_id)
             return self.db.get_task(task_id)
 
         return None
@@ -109,7 +108,7 @@ class Coordinator:
             task_id = agent.current_task_id
 
         if self.db.complete_task(task_id, agent_id, result):
-            self.db.update_agent_task(agent_id, None)
+            self.db.touch_agent(agent_id, current_task_id=None)
             return True
         return False
 
@@ -127,7 +126,7 @@ class Coordinator:
             task_id = agent.current_task_id
 
         if self.db.fail_task(task_id, agent_id, error):
-            self.db.update_agent_task(agent_id, None)
+            self.db.touch_agent(agent_id, current_task_id=None)
             return True
         return False
 
@@ -136,34 +135,33 @@ class Coordinator:
         Detect crashed agents and release their tasks.
         Returns list of recovered agent IDs.
         """
-        now = _utc_now_naive()
+        now = utc_now_naive()
         threshold = now - self.dead_threshold
         recovered = []
 
-        # Get all active agents
-        agents = self.db.get_all_agents(status=AgentStatus.ACTIVE)
-
-        for agent in agents:
-            # Check if heartbeat is stale
-            if agent.last_heartbeat_at >= threshold:
-                continue
-
-            # Double-check: is process actually dead?
-            if agent.pid and process_exists(agent.pid):
-                # Process alive but not heartbeating - log warning but don't kill
-                self.db.log_event(
-                    "agent_unresponsive",
-                    agent_id=agent.id,
-                    details={
-                        "pid": agent.pid,
-                        "last_heartbeat": agent.last_heartbeat_at.isoformat(),
-                    }
-                )
-                continue
-
-            # Agent is dead - recover
-            self._recover_agent(agent)
-            recovered.append(agent.id)
+        # Get active agents with a stale heartbeat
+        agents = self.db.get_stale_agents(threshold)
+        alive = live_pids(agent.pid for agent in agents if agent.pid)
+
+        # One commit for the whole sweep rather than one per status change
+        with self.db.transaction():
+            for agent in agents:
+                # Double-check: is process actually dead?
+                if agent.pid in alive:
+                    # Process alive but not heartbeating - log warning but don't kill
+                    self.db.log_event(
+                        "agent_unresponsive",
+                        agent_id=agent.id,
+                        details={
+                            "pid": agent.pid,
+                            "last_heartbeat": agent.last_heartbeat_at.isoformat(),
+                        }
+                    )
+                    continue
+
+                # Agent is dead - recover
+                self._recover_agent(agent)
+                recovered.append(agent.id)
 
         return recovered
 
@@ -192,20 +190,20 @@ class Coordinator:
         Recover tasks that have been claimed too long without completion.
         Returns count of recovered tasks.
         """
-        now = _utc_now_naive()
+        now = utc_now_naive()
         threshold = now - self.claim_timeout
 
         # Find stale claimed tasks
-        tasks = self.db.get_all_tasks(status=TaskStatus.CLAIMED)
+        tasks = self.db.get_stale_tasks(threshold)
         recovered = 0
 
-        for task in tasks:
-            if task.claimed_at and task.claimed_at < threshold:
-                self.db.abandon_task(
+        with self.db.transaction():
+            for task in tasks:
+                if self.db.abandon_task(
                     task.id,
                     reason=f"Task timed out after {self.claim_timeout.total_seconds()}s"
-                )
-                recovered += 1
+                ):
+                    recovered += 1
 
         return recovered
 
@@ -214,14 +212,24 @@ class Coordinator:
         Run full recovery cycle.
         Returns summary of recovery actions.
         """
-        dead_agents = self.recover_dead_agents()
-        stale_tasks = self.recover_stale_tasks()
-        requeued = self.db.requeue_abandoned_tasks()
+        # The sweeps share a single commit; archiving attaches other
+        # database files, which SQLite only allows outside a transaction.
+        with self.db.transaction():
+            dead_agents = self.recover_dead_agents()
+            stale_tasks = self.recover_stale_tasks()
+            requeued = self.db.requeue_abandoned_tasks()
+        try:
+            archived = self.db.archive_events(utc_now_naive() - self.event_retention)
+        except (sqlite3.Error, OSError):
+            # Recovery has already committed; archiving is housekeeping and
+            # is retried by the next run, so it must not fail the caller.
+            archived = 0
 
         return {
             "dead_agents": dead_agents,
             "stale_tasks": stale_tasks,
             "requeued_tasks": requeued,
+            "archived_events": archived,
         }
 
 
@@ -1,30 +1,45 @@
 """Database operations for Aqua."""
 
-import json
+import os
 import sqlite3
-from collections.abc import Generator
+import threading
+from collections.abc import Callable, Generator
 from contextlib import contextmanager
 from datetime import datetime, timedelta
 from pathlib import Path
 from typing import Any
 
 from aqua.models import Agent, AgentStatus, Event, Leader, Message, Task, TaskStatus
-from aqua.utils import utc_now
+from aqua.utils import json_dumps, json_loads, pinned_now, utc_now_naive
 
+# Schema version for migrations
+SCHEMA_VERSION = 5
 
-def _utc_now_naive():
-    """Get current UTC time as naive datetime for database storage."""
-    return utc_now().replace(tzinfo=None)
+# Connection tuning defaults; each can be overridden through the environment
+# for operators who need to cap memory use.
+SQLITE_CACHE_KB = 65536  # 64 MB page cache
+SQLITE_MMAP_SIZE = 268435456  # 256 MB memory-mapped I/O
+SQLITE_WAL_AUTOCHECKPOINT = 2000  # pages
 
-# Schema version for migrations
-SCHEMA_VERSION = 4
+# Prepared statements kept per connection. The filter-built queries in
+# get_all_tasks/get_events add many variants on top of the fixed SQL, so
+# go above the sqlite3 default to keep hot statements from being evicted.
+SQLITE_STATEMENT_CACHE = 256
+
+
+def _env_int(name: str, default: int) -> int:
+    """Read an integer setting from the environment, falling back to default."""
+    value = os.environ.get(name)
+    if not value:
+        return default
+    try:
+        return int(value)
+    except ValueError:
+        return default
 
-SCHEMA = """
--- Enable WAL mode for concurrent access
-PRAGMA journal_mode=WAL;
-PRAGMA busy_timeout=5000;
-PRAGMA synchronous=NORMAL;
 
+# DDL only; connection PRAGMAs are applied in Database._get_connection
+SCHEMA = """
 -- Agents table: registered participants
 CREATE TABLE IF NOT EXISTS agents (
     id TEXT PRIMARY KEY,
@@ -81,6 +96,35 @@ CREATE INDEX IF NOT EXISTS idx_tasks_status ON tasks(status);
 CREATE INDEX IF NOT EXISTS idx_tasks_claimed_by ON tasks(claimed_by);
 CREATE INDEX IF NOT EXISTS idx_tasks_priority ON tasks(priority DESC, created_at ASC);
 
+-- Task tags: normalized copy of tasks.tags for indexed tag lookups
+CREATE TABLE IF NOT EXISTS task_tags (
+    task_id TEXT NOT NULL,
+    tag TEXT NOT NULL,
+    PRIMARY KEY (task_id, tag)
+);
+
+CREATE INDEX IF NOT EXISTS idx_task_tags_tag ON task_tags(tag);
+
+-- Triggers keep task_tags in step with tasks.tags for every writer,
+-- including older aqua versions that only know the JSON column.
+CREATE TRIGGER IF NOT EXISTS task_tags_insert AFTER INSERT ON tasks
+BEGIN
+    INSERT OR IGNORE INTO task_tags (task_id, tag)
+        SELECT NEW.id, value FROM json_each(NEW.tags);
+END;
+
+CREATE TRIGGER IF NOT EXISTS task_tags_update AFTER UPDATE OF tags ON tasks
+BEGIN
+    DELETE FROM task_tags WHERE task_id = OLD.id;
+    INSERT OR IGNORE INTO task_tags (task_id, tag)
+        SELECT NEW.id, value FROM json_each(NEW.tags);
+END;
+
+CREATE TRIGGER IF NOT EXISTS task_tags_delete AFTER DELETE ON tasks
+BEGIN
+    DELETE FROM task_tags WHERE task_id = OLD.id;
+END;
+
 -- Messages table: inter-agent communication
 CREATE TABLE IF NOT EXISTS messages (
     id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -119,59 +163,218 @@ CREATE TABLE IF NOT EXISTS file_locks (
 
 CREATE INDEX IF NOT EXISTS idx_file_locks_agent ON file_locks(agent_id);
 
--- Schema version tracking
+-- Legacy schema version marker, still read by aqua releases before v5
 CREATE TABLE IF NOT EXISTS schema_version (
     version INTEGER PRIMARY KEY
 );
 """
 
+# Sentinel for touch_agent: leave current_task_id as it is
+_UNCHANGED: Any = object()
+
+_INSERT_AGENT_SQL = """
+    INSERT INTO agents (id, name, agent_type, pid, status, last_heartbeat_at,
+                      registered_at, current_task_id, capabilities, metadata)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+_INSERT_TASK_SQL = """
+    INSERT INTO tasks (id, title, description, status, priority, created_by,
+                     claimed_by, claim_term, created_at, updated_at, claimed_at,
+                     completed_at, result, error, retry_count, max_retries,
+                     tags, context, version, depends_on)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+# One row with a column per status, e.g. COUNT(*) FILTER (WHERE status = 'pending') AS pending
+_TASK_COUNTS_SQL = "SELECT {} FROM tasks".format(", ".join(
+    f"COUNT(*) FILTER (WHERE status = '{status.value}') AS {status.value}" for status in TaskStatus
+))
+
+# Pending tasks whose dependencies are all done; a dependency id that no
+# longer exists counts as unmet (LEFT JOIN leaves d.status NULL).
+_READY_TASKS_SQL = """
+    SELECT * FROM tasks t
+    WHERE t.status = 'pending'
+    AND NOT EXISTS (
+        SELECT 1 FROM json_each(COALESCE(t.depends_on, '[]')) AS dep
+        LEFT JOIN tasks d ON d.id = dep.value
+        WHERE d.status IS NULL OR d.status != 'done'
+    )
+"""
+
+# Leader election. Binds: ?1 agent_id, ?2 new lease expiry, ?3 now (both
+# ISO strings); numbered binds let each value be passed once.
+_CURRENT_LEADER_SQL = "SELECT agent_id, term, lease_expires_at FROM leader WHERE id = 1"
+
+_FIRST_LEADER_SQL = """
+    INSERT INTO leader (id, agent_id, term, lease_expires_at, elected_at)
+    VALUES (1, ?1, 1, ?2, ?3)
+"""
+
+_RENEW_LEASE_SQL = "UPDATE leader SET lease_expires_at = ? WHERE id = 1"
+
+_TAKEOVER_SQL = """
+    UPDATE leader
+    SET agent_id = ?1, term = term + 1, lease_expires_at = ?2, elected_at = ?3
+    WHERE id = 1
+"""
+
+_INSERT_EVENT_SQL = """
+    INSERT INTO events (timestamp, event_type, agent_id, task_id, details)
+    VALUES (?, ?, ?, ?, ?)
+"""
+
+
+def _json_column(value: list | dict | None) -> str | None:
+    """Encode a list/dict column, storing empty containers as NULL."""
+    return json_dumps(value) if value else None
+
+
+def _agent_params(agent: Agent, now: str) -> tuple:
+    """Build the _INSERT_AGENT_SQL parameters for an agent."""
+    return (
+        agent.id,
+        agent.name,
+        agent.agent_type.value,
+        agent.pid,
+        agent.status.value,
+        now,
+        now,
+        agent.current_task_id,
+        _json_column(agent.capabilities),
+        _json_column(agent.metadata),
+    )
+
+
+def _task_params(task: Task, now: str) -> tuple:
+    """Build the _INSERT_TASK_SQL parameters for a task."""
+    return (
+        task.id,
+        task.title,
+        task.description,
+        task.status.value,
+        task.priority,
+        task.created_by,
+        task.claimed_by,
+        task.claim_term,
+        now,
+        now,
+        task.claimed_at.isoformat() if task.claimed_at else None,
+        task.completed_at.isoformat() if task.completed_at else None,
+        task.result,
+        task.error,
+        task.retry_count,
+        task.max_retries,
+        _json_column(task.tags),
+        task.context,
+        task.version,
+        _json_column(task.depends_on),
+    )
+
+
+def _created_at() -> str:
+    """Timestamp for new rows: the enclosing batch_now() value, else now.
+
+    Single and bulk inserts both use it, so rows created inside one
+    batch_now() block carry the same timestamp as the models built there.
+    """
+    return (pinned_now() or utc_now_naive()).isoformat()
+
+
+def _event_params(
+    now: str,
+    event_type: str,
+    agent_id: str | None = None,
+    task_id: str | None = None,
+    details: dict | None = None,
+) -> tuple:
+    """Build the _INSERT_EVENT_SQL parameters for an event."""
+    return (now, event_type, agent_id, task_id, _json_column(details))
+
 
 class Database:
     """SQLite database wrapper with connection management."""
 
     def __init__(self, db_path: Path):
         self.db_path = db_path
-        self._conn: sqlite3.Connection | None = None
+        # One connection per thread: sqlite3 connections must not be used
+        # from two threads at once, and separate connections give readers
+        # their own WAL snapshot instead of serializing on a shared cursor.
+        self._local = threading.local()
+        self._connections: list[sqlite3.Connection] = []
+        self._connections_lock = threading.Lock()
+        # Clock for leader leases; tests swap in a fake to skip real waits
+        self._now: Callable[[], datetime] = utc_now_naive
 
     def _get_connection(self) -> sqlite3.Connection:
-        """Get or create database connection."""
-        if self._conn is None:
-            self._conn = sqlite3.connect(
+        """Get or create the calling thread's database connection."""
+        conn: sqlite3.Connection | None = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(
                 str(self.db_path),
                 timeout=30.0,
                 isolation_level=None,  # Autocommit by default
+                check_same_thread=False,  # close() may run on another thread
+                cached_statements=SQLITE_STATEMENT_CACHE,
             )
-            self._conn.row_factory = sqlite3.Row
+            conn.row_factory = sqlite3.Row
             # Enable WAL mode
-            self._conn.execute("PRAGMA journal_mode=WAL")
-            self._conn.execute("PRAGMA busy_timeout=5000")
-            self._conn.execute("PRAGMA synchronous=NORMAL")
-        return self._conn
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA busy_timeout=5000")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            # Keep hot pages in RAM and temp tables out of the filesystem
+            cache_kb = _env_int("AQUA_SQLITE_CACHE_KB", SQLITE_CACHE_KB)
+            mmap_size = _env_int("AQUA_SQLITE_MMAP_SIZE", SQLITE_MMAP_SIZE)
+            autocheckpoint = _env_int("AQUA_SQLITE_WAL_AUTOCHECKPOINT", SQLITE_WAL_AUTOCHECKPOINT)
+            conn.execute(f"PRAGMA cache_size=-{abs(cache_kb)}")
+            conn.execute("PRAGMA temp_store=MEMORY")
+            conn.execute(f"PRAGMA mmap_size={mmap_size}")
+            conn.execute(f"PRAGMA wal_autocheckpoint={autocheckpoint}")
+            self._local.conn = conn
+            with self._connections_lock:
+                self._connections.append(conn)
+        return conn
 
     @property
     def conn(self) -> sqlite3.Connection:
-        """Get the database connection."""
+        """Get the database connection for the calling thread."""
         return self._get_connection()
 
     def close(self) -> None:
-        """Close the database connection."""
-        if self._conn:
-            self._conn.close()
-            self._conn = None
+        """Close every connection opened by this database, across all threads."""
+        with self._connections_lock:
+            connections, self._connections = self._connections, []
+            self._local = threading.local()
+        for conn in connections:
+            try:
+                # Let SQLite refresh planner statistics gathered by this connection
+                conn.execute("PRAGMA optimize")
+            except sqlite3.Error:
+                pass
+            conn.close()
 
     def init_schema(self) -> None:
         """Initialize the database schema."""
+        # A current user_version means every table already exists, so skip
+        # parsing the whole script on each open. A newer version means a
+        # newer aqua wrote this file; stamping ours would downgrade it.
+        if self.conn.execute("PRAGMA user_version").fetchone()[0] >= SCHEMA_VERSION:
+            return
         self.conn.executescript(SCHEMA)
-        # Set schema version
-        self.conn.execute(
-            "INSERT OR REPLACE INTO schema_version (version) VALUES (?)",
-            (SCHEMA_VERSION,)
-        )
+        _stamp_schema_version(self.conn)
 
     @contextmanager
     def transaction(self) -> Generator[sqlite3.Connection, None, None]:
-        """Context manager for explicit transactions."""
+        """Context manager for explicit transactions.
+
+        Nested use joins the enclosing transaction, so a mutation and the
+        audit event it logs take the write lock and commit only once.
+        """
         conn = self.conn
+        if conn.in_transaction:
+            yield conn
+            return
         conn.execute("BEGIN IMMEDIATE")
         try:
             yield conn
@@ -186,36 +389,35 @@ class Database:
 
     def create_agent(self, agent: Agent) -> Agent:
         """Create a new agent."""
-        now = _utc_now_naive().isoformat()
-        self.conn.execute(
-            """
-            INSERT INTO agents (id, name, agent_type, pid, status, last_heartbeat_at,
-                              registered_at, current_task_id, capabilities, metadata)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            """,
-            (
-                agent.id,
-                agent.name,
-                agent.agent_type.value,
-                agent.pid,
-                agent.status.value,
-                now,
-                now,
-                agent.current_task_id,
-                json.dumps(agent.capabilities),
-                json.dumps(agent.metadata),
-            ),
-        )
-        self.log_event("agent_joined", agent_id=agent.id, details={"name": agent.name})
+        now = _created_at()
+        with self.transaction() as conn:
+            conn.execute(_INSERT_AGENT_SQL, _agent_params(agent, now))
+            self.log_event("agent_joined", agent_id=agent.id, details={"name": agent.name})
         return agent
 
+    def create_agents_bulk(self, agents: list[Agent]) -> list[Agent]:
+        """Create several agents in one transaction.
+
+        Every row is stamped with one timestamp, see _created_at.
+        """
+        now = _created_at()
+        agent_rows = [_agent_params(agent, now) for agent in agents]
+        event_rows = [
+            _event_params(now, "agent_joined", agent_id=agent.id, details={"name": agent.name})
+            for agent in agents
+        ]
+        with self.transaction() as conn:
+            conn.executemany(_INSERT_AGENT_SQL, agent_rows)
+            conn.executemany(_INSERT_EVENT_SQL, event_rows)
+        return agents
+
     def get_agent(self, agent_id: str) -> Agent | None:
         """Get an agent by ID."""
         cursor = self.conn.execute(
             "SELECT * FROM agents WHERE id = ?", (agent_id,)
         )
         row = cursor.fetchone()
-        return Agent.from_row(dict(row)) if row else None
+        return Agent.from_row(row) if row else None
 
     def get_agent_by_name(self, name: str) -> Agent | None:
         """Get an agent by name."""
@@ -223,23 +425,39 @@ class Database:
             "SELECT * FROM agents WHERE name = ?", (name,)
         )
         row = cursor.fetchone()
-        return Agent.from_row(dict(row)) if row else None
+        return Agent.from_row(row) if row else None
 
     def get_all_agents(self, status: AgentStatus | None = None) -> list[Agent]:
         """Get all agents, optionally filtered by status."""
         if status:
             cursor = self.conn.execute(
-                "SELECT * FROM agents WHERE status = ? ORDER BY registered_at",
+                "SELECT * FROM agents WHERE status = ? ORDER BY registered_at, rowid",
                 (status.value,)
             )
         else:
-            cursor = self.conn.execute("SELECT * FROM agents ORDER BY registered_at")
-        return [Agent.from_row(dict(row)) for row in cursor.fetchall()]
+            cursor = self.conn.execute("SELECT * FROM agents ORDER BY registered_at, rowid")
+        return [Agent.from_row(row) for row in cursor.fetchall()]
+
+    def get_stale_agents(self, heartbeat_before: datetime) -> list[Agent]:
+        """Get active agents whose last heartbeat is older than the given time.
+
+        ISO-8601 strings sort chronologically, so the comparison runs in SQL
+        as a range scan instead of parsing every agent's heartbeat in Python.
+        """
+        cursor = self.conn.execute(
+            """
+            SELECT * FROM agents
+            WHERE status = 'active' AND last_heartbeat_at < ?
+            ORDER BY registered_at, rowid
+            """,
+            (heartbeat_before.isoformat(),)
+        )
+        return [Agent.from_row(row) for row in cursor.fetchall()]
 
     def update_heartbeat(self, agent_id: str) -> None:
         """Update an agent's heartbeat timestamp and renew leader lease if leader."""
 
-        now = _utc_now_naive()
+        now = utc_now_naive()
         now_iso = now.isoformat()
 
         # Update agent heartbeat
@@ -272,10 +490,44 @@ class Database:
             (task_id, agent_id)
         )
 
+    def touch_agent(
+        self,
+        agent_id: str,
+        *,
+        status: AgentStatus | None = None,
+        current_task_id: str | None = _UNCHANGED,
+    ) -> None:
+        """Refresh an agent's heartbeat, optionally setting status and current task.
+
+        Combines update_agent_status and update_agent_task with a refresh
+        of last_heartbeat_at in one UPDATE. Unlike update_heartbeat it does
+        not renew the leader lease. Pass current_task_id=None to clear the
+        current task; omit it to leave the task unchanged.
+        """
+        now = utc_now_naive().isoformat()
+        set_task = current_task_id is not _UNCHANGED
+        self.conn.execute(
+            """
+            UPDATE agents
+            SET last_heartbeat_at = ?,
+                status = COALESCE(?, status),
+                current_task_id = CASE WHEN ? THEN ? ELSE current_task_id END
+            WHERE id = ?
+            """,
+            (
+                now,
+                status.value if status else None,
+                set_task,
+                current_task_id if set_task else None,
+                agent_id,
+            )
+        )
+
     def delete_agent(self, agent_id: str) -> None:
         """Delete an agent."""
-        self.conn.execute("DELETE FROM agents WHERE id = ?", (agent_id,))
-        self.log_event("agent_left", agent_id=agent_id)
+        with self.transaction() as conn:
+            conn.execute("DELETE FROM agents WHERE id = ?", (agent_id,))
+            self.log_event("agent_left", agent_id=agent_id)
 
     # =========================================================================
     # Task Operations
@@ -283,46 +535,33 @@ class Database:
 
     def create_task(self, task: Task) -> Task:
         """Create a new task."""
-        now = _utc_now_naive().isoformat()
-        self.conn.execute(
-            """
-            INSERT INTO tasks (id, title, description, status, priority, created_by,
-                             claimed_by, claim_term, created_at, updated_at, claimed_at,
-                             completed_at, result, error, retry_count, max_retries,
-                             tags, context, version, depends_on)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            """,
-            (
-                task.id,
-                task.title,
-                task.description,
-                task.status.value,
-                task.priority,
-                task.created_by,
-                task.claimed_by,
-                task.claim_term,
-                now,
-                now,
-                task.claimed_at.isoformat() if task.claimed_at else None,
-                task.completed_at.isoformat() if task.completed_at else None,
-                task.result,
-                task.error,
-                task.retry_count,
-                task.max_retries,
-                json.dumps(task.tags),
-                task.context,
-                task.version,
-                json.dumps(task.depends_on) if task.depends_on else None,
-            ),
-        )
-        self.log_event("task_created", task_id=task.id, details={"title": task.title})
+        now = _created_at()
+        with self.transaction() as conn:
+            conn.execute(_INSERT_TASK_SQL, _task_params(task, now))
+            self.log_event("task_created", task_id=task.id, details={"title": task.title})
         return task
 
+    def create_tasks_bulk(self, tasks: list[Task]) -> list[Task]:
+        """Create several tasks in one transaction.
+
+        Every row is stamped with one timestamp, see _created_at.
+        """
+        now = _created_at()
+        task_rows = [_task_params(task, now) for task in tasks]
+        event_rows = [
+            _event_params(now, "task_created", task_id=task.id, details={"title": task.title})
+            for task in tasks
+        ]
+        with self.transaction() as conn:
+            conn.executemany(_INSERT_TASK_SQL, task_rows)
+            conn.executemany(_INSERT_EVENT_SQL, event_rows)
+        return tasks
+
     def get_task(self, task_id: str) -> Task | None:
         """Get a task by ID."""
         cursor = self.conn.execute("SELECT * FROM tasks WHERE id = ?", (task_id,))
         row = cursor.fetchone()
-        return Task.from_row(dict(row)) if row else None
+        return Task.from_row(row) if row else None
 
     def get_all_tasks(
         self,
@@ -341,32 +580,20 @@ class Database:
             query += " AND claimed_by = ?"
             params.append(claimed_by)
         if tag:
-            query += " AND tags LIKE ?"
-            params.append(f'%"{tag}"%')
+            query += " AND id IN (SELECT task_id FROM task_tags WHERE tag = ?)"
+            params.append(tag)
 
-        query += " ORDER BY priority DESC, created_at ASC"
+        query += " ORDER BY priority DESC, created_at ASC, rowid ASC"
 
         cursor = self.conn.execute(query, params)
-        return [Task.from_row(dict(row)) for row in cursor.fetchall()]
+        return [Task.from_row(row) for row in cursor.fetchall()]
 
     def get_next_pending_task(self) -> Task | None:
         """Get the next pending task (highest priority, oldest) with met dependencies."""
-        # Get all pending tasks ordered by priority
-        cursor = self.conn.execute(
-            """
-            SELECT * FROM tasks
-            WHERE status = 'pending'
-            ORDER BY priority DESC, created_at ASC
-            """
-        )
-        rows = cursor.fetchall()
-
-        for row in rows:
-            task = Task.from_row(dict(row))
-            if self._dependencies_met(task):
-                return task
-
-        return None
+        row = self.conn.execute(
+            _READY_TASKS_SQL + "ORDER BY t.priority DESC, t.created_at ASC, t.rowid ASC LIMIT 1"
+        ).fetchone()
+        return Task.from_row(row) if row else None
 
     def get_next_pending_task_for_role(self, role: str | None) -> tuple[Task | None, bool]:
         """Get next pending task, preferring tasks matching agent's role.
@@ -385,21 +612,16 @@ class Database:
             return (task, True) if task else (None, True)  # No role = always "match"
 
         # First: try to find a task matching the agent's role
-        cursor = self.conn.execute(
-            """
-            SELECT * FROM tasks
-            WHERE status = 'pending'
-            AND tags LIKE ?
-            ORDER BY priority DESC, created_at ASC
+        row = self.conn.execute(
+            _READY_TASKS_SQL
+            + """
+            AND t.id IN (SELECT task_id FROM task_tags WHERE tag = ?)
+            ORDER BY t.priority DESC, t.created_at ASC, t.rowid ASC LIMIT 1
             """,
-            (f'%"{role}"%',)
-        )
-        rows = cursor.fetchall()
-
-        for row in rows:
-            task = Task.from_row(dict(row))
-            if self._dependencies_met(task):
-                return (task, True)  # Found a role-matching task!
+            (role,)
+        ).fetchone()
+        if row:
+            return (Task.from_row(row), True)  # Found a role-matching task!
 
         # Fallback: return any pending task (not a role match)
         task = self.get_next_pending_task()
@@ -418,12 +640,18 @@ class Database:
 
     def get_blocking_dependencies(self, task: Task) -> list[Task]:
         """Get list of dependencies that are not yet complete."""
-        blocking = []
-        for dep_id in task.depends_on:
-            dep_task = self.get_task(dep_id)
-            if dep_task and dep_task.status != TaskStatus.DONE:
-                blocking.append(dep_task)
-        return blocking
+        if not task.depends_on:
+            return []
+        cursor = self.conn.execute(
+            """
+            SELECT t.* FROM json_each(?) AS dep
+            JOIN tasks t ON t.id = dep.value
+            WHERE t.status != 'done'
+            ORDER BY dep.key
+            """,
+            (json_dumps(task.depends_on),)
+        )
+        return [Task.from_row(row) for row in cursor.fetchall()]
 
     def would_create_cycle(self, task_id: str, depends_on: list[str]) -> list[str] | None:
         """
@@ -435,11 +663,14 @@ class Database:
         if not depends_on:
             return None
 
-        # Build dependency graph from existing tasks
-        all_tasks = self.get_all_tasks()
-        dep_graph: dict[str, list[str]] = {}
-        for task in all_tasks:
-            dep_graph[task.id] = task.depends_on or []
+        # Build dependency graph from existing tasks; only the edges are
+        # needed, so skip materializing a Task per row
+        cursor = self.conn.execute(
+            "SELECT id, depends_on FROM tasks WHERE depends_on IS NOT NULL"
+        )
+        dep_graph: dict[str, list[str]] = {
+            row["id"]: json_loads(row["depends_on"]) for row in cursor
+        }
 
         # Add the proposed dependencies for the new/updated task
         dep_graph[task_id] = depends_on
@@ -475,7 +706,8 @@ class Database:
         Tasks with no dependencies are sorted by priority DESC, created_at ASC.
         Raises ValueError if a cycle is detected.
         """
-        tasks = {tid: self.get_task(tid) for tid in task_ids if self.get_task(tid)}
+        fetched = (self.get_task(tid) for tid in task_ids)
+        tasks = {task.id: task for task in fetched if task}
 
         if not tasks:
             return []
@@ -559,92 +791,108 @@ class Database:
 
         return result
 
-    def claim_task(
-        self, task_id: str, agent_id: str, term: int
-    ) -> bool:
-        """Atomically claim a task. Returns True if successful."""
-        now = _utc_now_naive().isoformat()
+    def get_stale_tasks(self, claimed_before: datetime) -> list[Task]:
+        """Get claimed tasks whose claim is older than the given time."""
         cursor = self.conn.execute(
             """
-            UPDATE tasks
-            SET status = 'claimed', claimed_by = ?, claimed_at = ?,
-                claim_term = ?, updated_at = ?
-            WHERE id = ? AND status = 'pending'
+            SELECT * FROM tasks
+            WHERE status = 'claimed' AND claimed_at < ?
+            ORDER BY priority DESC, created_at ASC, rowid ASC
             """,
-            (agent_id, now, term, now, task_id)
+            (claimed_before.isoformat(),)
         )
-        if cursor.rowcount == 1:
-            self.log_event("task_claimed", agent_id=agent_id, task_id=task_id)
-            return True
-        return False
+        return [Task.from_row(row) for row in cursor.fetchall()]
+
+    def claim_task(
+        self, task_id: str, agent_id: str, term: int
+    ) -> bool:
+        """Atomically claim a task. Returns True if successful."""
+        now = utc_now_naive().isoformat()
+        with self.transaction() as conn:
+            cursor = conn.execute(
+                """
+                UPDATE tasks
+                SET status = 'claimed', claimed_by = ?, claimed_at = ?,
+                    claim_term = ?, updated_at = ?
+                WHERE id = ? AND status = 'pending'
+                """,
+                (agent_id, now, term, now, task_id)
+            )
+            if cursor.rowcount == 1:
+                self.log_event("task_claimed", agent_id=agent_id, task_id=task_id)
+                return True
+            return False
 
     def complete_task(
         self, task_id: str, agent_id: str, result: str | None = None
     ) -> bool:
         """Mark a task as completed."""
-        now = _utc_now_naive().isoformat()
-        cursor = self.conn.execute(
-            """
-            UPDATE tasks
-            SET status = 'done', completed_at = ?, result = ?, updated_at = ?
-            WHERE id = ? AND claimed_by = ? AND status = 'claimed'
-            """,
-            (now, result, now, task_id, agent_id)
-        )
-        if cursor.rowcount == 1:
-            self.log_event(
-                "task_completed",
-                agent_id=agent_id,
-                task_id=task_id,
-                details={"result": result}
+        now = utc_now_naive().isoformat()
+        with self.transaction() as conn:
+            cursor = conn.execute(
+                """
+                UPDATE tasks
+                SET status = 'done', completed_at = ?, result = ?, updated_at = ?
+                WHERE id = ? AND claimed_by = ? AND status = 'claimed'
+                """,
+                (now, result, now, task_id, agent_id)
             )
-            return True
-        return False
+            if cursor.rowcount == 1:
+                self.log_event(
+                    "task_completed",
+                    agent_id=agent_id,
+                    task_id=task_id,
+                    details={"result": result}
+                )
+                return True
+            return False
 
     def fail_task(
         self, task_id: str, agent_id: str, error: str
     ) -> bool:
         """Mark a task as failed."""
-        now = _utc_now_naive().isoformat()
-        cursor = self.conn.execute(
-            """
-            UPDATE tasks
-            SET status = 'failed', error = ?, updated_at = ?,
-                retry_count = retry_count + 1
-            WHERE id = ? AND claimed_by = ? AND status = 'claimed'
-            """,
-            (error, now, task_id, agent_id)
-        )
-        if cursor.rowcount == 1:
-            self.log_event(
-                "task_failed",
-                agent_id=agent_id,
-                task_id=task_id,
-                details={"error": error}
+        now = utc_now_naive().isoformat()
+        with self.transaction() as conn:
+            cursor = conn.execute(
+                """
+                UPDATE tasks
+                SET status = 'failed', error = ?, updated_at = ?,
+                    retry_count = retry_count + 1
+                WHERE id = ? AND claimed_by = ? AND status = 'claimed'
+                """,
+                (error, now, task_id, agent_id)
             )
-            return True
-        return False
+            if cursor.rowcount == 1:
+                self.log_event(
+                    "task_failed",
+                    agent_id=agent_id,
+                    task_id=task_id,
+                    details={"error": error}
+                )
+                return True
+            return False
 
     def abandon_task(self, task_id: str, reason: str = "abandoned") -> bool:
         """Mark a task as abandoned (e.g., agent died)."""
-        now = _utc_now_naive().isoformat()
-        cursor = self.conn.execute(
-            """
-            UPDATE tasks
-            SET status = 'abandoned', claimed_by = NULL, error = ?,
-                updated_at = ?, retry_count = retry_count + 1
-            WHERE id = ? AND status = 'claimed'
-            """,
-            (reason, now, task_id)
-        )
-        if cursor.rowcount == 1:
-            self.log_event("task_abandoned", task_id=task_id, details={"reason": reason})
-            return True
-        return False
+        now = utc_now_naive().isoformat()
+        with self.transaction() as conn:
+            cursor = conn.execute(
+                """
+                UPDATE tasks
+                SET status = 'abandoned', claimed_by = NULL, error = ?,
+                    updated_at = ?, retry_count = retry_count + 1
+                WHERE id = ? AND status = 'claimed'
+                """,
+                (reason, now, task_id)
+            )
+            if cursor.rowcount == 1:
+                self.log_event("task_abandoned", task_id=task_id, details={"reason": reason})
+                return True
+            return False
 
     def requeue_abandoned_tasks(self) -> int:
         """Move abandoned tasks back to pending if under retry limit."""
-        now = _utc_now_naive().isoformat()
+        now = utc_now_naive().isoformat()
         cursor = self.conn.execute(
             """
             UPDATE tasks
@@ -657,7 +905,7 @@ class Database:
 
     def update_task_progress(self, task_id: str, context: str) -> bool:
         """Update task progress/context."""
-        now = _utc_now_naive().isoformat()
+        now = utc_now_naive().isoformat()
         cursor = self.conn.execute(
             """
             UPDATE tasks SET context = ?, updated_at = ? WHERE id = ?
@@ -668,15 +916,7 @@ class Database:
 
     def get_task_counts(self) -> dict:
         """Get counts of tasks by status."""
-        cursor = self.conn.execute(
-            """
-            SELECT status, COUNT(*) as count FROM tasks GROUP BY status
-            """
-        )
-        counts = {s.value: 0 for s in TaskStatus}
-        for row in cursor.fetchall():
-            counts[row["status"]] = row["count"]
-        return counts
+        return dict(self.conn.execute(_TASK_COUNTS_SQL).fetchone())
 
     # =========================================================================
     # Leader Operations
@@ -686,7 +926,7 @@ class Database:
         """Get the current leader."""
         cursor = self.conn.execute("SELECT * FROM leader WHERE id = 1")
         row = cursor.fetchone()
-        return Leader.from_row(dict(row)) if row else None
+        return Leader.from_row(row) if row else None
 
     def get_current_term(self) -> int:
         """Get the current leader term."""
@@ -699,23 +939,19 @@ class Database:
         Returns (is_leader, term).
         """
 
-        now = _utc_now_naive()
+        now = self._now()
         new_lease_expires = (now + timedelta(seconds=lease_seconds)).isoformat()
         now_iso = now.isoformat()
 
+        params = (agent_id, new_lease_expires, now_iso)
         with self.transaction() as conn:
-            cursor = conn.execute("SELECT * FROM leader WHERE id = 1")
-            row = cursor.fetchone()
+            # BEGIN IMMEDIATE holds the write lock, so the row read here
+            # cannot change before the write that follows it.
+            current = conn.execute(_CURRENT_LEADER_SQL).fetchone()
 
-            if row is None:
+            if current is None:
                 # No leader - become first
-                conn.execute(
-                    """
-                    INSERT INTO leader (id, agent_id, term, lease_expires_at, elected_at)
-                    VALUES (1, ?, 1, ?, ?)
-                    """,
-                    (agent_id, new_lease_expires, now_iso)
-                )
+                conn.execute(_FIRST_LEADER_SQL, params)
                 self.log_event(
                     "leader_elected",
                     agent_id=agent_id,
@@ -723,44 +959,28 @@ class Database:
                 )
                 return (True, 1)
 
-            current = Leader.from_row(dict(row))
-
-            if current.lease_expires_at > now:
+            if current["lease_expires_at"] > now_iso:
                 # Lease still valid
-                if current.agent_id == agent_id:
+                if current["agent_id"] == agent_id:
                     # I'm leader, renew lease
-                    conn.execute(
-                        "UPDATE leader SET lease_expires_at = ? WHERE id = 1",
-                        (new_lease_expires,)
-                    )
-                    return (True, current.term)
+                    conn.execute(_RENEW_LEASE_SQL, (new_lease_expires,))
+                    return (True, current["term"])
                 # Someone else is leader
                 return (False, 0)
 
-            # Lease expired - try to take over
-            new_term = current.term + 1
-            cursor = conn.execute(
-                """
-                UPDATE leader
-                SET agent_id = ?, term = ?, lease_expires_at = ?, elected_at = ?
-                WHERE id = 1 AND term = ?
-                """,
-                (agent_id, new_term, new_lease_expires, now_iso, current.term)
+            # Lease expired - take over
+            conn.execute(_TAKEOVER_SQL, params)
+            term = current["term"] + 1
+            self.log_event(
+                "leader_elected",
+                agent_id=agent_id,
+                details={
+                    "term": term,
+                    "reason": "lease_expired",
+                    "previous_leader": current["agent_id"]
+                }
             )
-
-            if cursor.rowcount == 1:
-                self.log_event(
-                    "leader_elected",
-                    agent_id=agent_id,
-                    details={
-                        "term": new_term,
-                        "reason": "lease_expired",
-                        "previous_leader": current.agent_id
-                    }
-                )
-                return (True, new_term)
-
-            return (False, 0)
+            return (True, term)
 
     # =========================================================================
     # Message Operations
@@ -775,7 +995,7 @@ class Database:
         reply_to: int | None = None,
     ) -> Message:
         """Create a new message."""
-        now = _utc_now_naive().isoformat()
+        now = utc_now_naive().isoformat()
         cursor = self.conn.execute(
             """
             INSERT INTO messages (from_agent, to_agent, content, message_type, created_at, reply_to)
@@ -799,7 +1019,7 @@ class Database:
         """Get a message by ID."""
         cursor = self.conn.execute("SELECT * FROM messages WHERE id = ?", (message_id,))
         row = cursor.fetchone()
-        return Message.from_row(dict(row)) if row else None
+        return Message.from_row(row) if row else None
 
     def get_replies(self, message_id: int) -> list[Message]:
         """Get all replies to a message."""
@@ -807,7 +1027,7 @@ class Database:
             "SELECT * FROM messages WHERE reply_to = ? ORDER BY created_at ASC",
             (message_id,)
         )
-        return [Message.from_row(dict(row)) for row in cursor.fetchall()]
+        return [Message.from_row(row) for row in cursor.fetchall()]
 
     def get_messages(
         self,
@@ -831,20 +1051,22 @@ class Database:
         params.append(limit)
 
         cursor = self.conn.execute(query, params)
-        return [Message.from_row(dict(row)) for row in cursor.fetchall()]
+        return [Message.from_row(row) for row in cursor.fetchall()]
 
     def mark_messages_read(self, agent_id: str, message_ids: list[int]) -> int:
         """Mark messages as read."""
         if not message_ids:
             return 0
-        now = _utc_now_naive().isoformat()
-        placeholders = ",".join("?" * len(message_ids))
+        now = utc_now_naive().isoformat()
+        # Pass the ids as one JSON array so the statement text is the same for
+        # every batch size and stays in the prepared-statement cache.
         cursor = self.conn.execute(
-            f"""
+            """
             UPDATE messages SET read_at = ?
-            WHERE id IN ({placeholders}) AND (to_agent = ? OR to_agent IS NULL)
+            WHERE id IN (SELECT value FROM json_each(?))
+            AND (to_agent = ? OR to_agent IS NULL)
             """,
-            [now] + message_ids + [agent_id]
+            (now, json_dumps(message_ids), agent_id)
         )
         return cursor.rowcount
 
@@ -860,41 +1082,147 @@ class Database:
         details: dict | None = None,
     ) -> None:
         """Log an event."""
-        now = _utc_now_naive().isoformat()
+        now = _created_at()
         self.conn.execute(
-            """
-            INSERT INTO events (timestamp, event_type, agent_id, task_id, details)
-            VALUES (?, ?, ?, ?, ?)
-            """,
-            (now, event_type, agent_id, task_id, json.dumps(details) if details else None)
+            _INSERT_EVENT_SQL, _event_params(now, event_type, agent_id, task_id, details)
         )
 
+    def log_events_bulk(
+        self,
+        events: list[tuple[str, str | None, str | None, dict | None]],
+    ) -> None:
+        """Log several events in one transaction.
+
+        Each entry is an (event_type, agent_id, task_id, details) tuple,
+        matching log_event's arguments. The events share one timestamp,
+        see _created_at.
+        """
+        now = _created_at()
+        with self.transaction() as conn:
+            conn.executemany(
+                _INSERT_EVENT_SQL, [_event_params(now, *event) for event in events]
+            )
+
     def get_events(
         self,
         event_type: str | None = None,
         agent_id: str | None = None,
         task_id: str | None = None,
         limit: int = 100,
+        include_archived: bool = False,
     ) -> list[Event]:
-        """Get events with optional filters."""
-        query = "SELECT * FROM events WHERE 1=1"
+        """Get events with optional filters, newest first.
+
+        With include_archived, the monthly files written by archive_events
+        are searched too, newest month first, whenever the live table has
+        fewer than `limit` matches. That opens one file per archived month,
+        so only one-off history lookups such as `aqua log` ask for it.
+        """
+        where = "WHERE 1=1"
         params: list[Any] = []
 
         if event_type:
-            query += " AND event_type = ?"
+            where += " AND event_type = ?"
             params.append(event_type)
         if agent_id:
-            query += " AND agent_id = ?"
+            where += " AND agent_id = ?"
             params.append(agent_id)
         if task_id:
-            query += " AND task_id = ?"
+            where += " AND task_id = ?"
             params.append(task_id)
 
-        query += " ORDER BY timestamp DESC LIMIT ?"
-        params.append(limit)
+        query = f"SELECT * FROM events {where} ORDER BY timestamp DESC, id DESC LIMIT ?"
+        cursor = self.conn.execute(query, [*params, limit])
+        events = [Event.from_row(row) for row in cursor.fetchall()]
+
+        if include_archived:
+            # Archived months are all older than the live table, so
+            # appending shard by shard keeps the newest-first order.
+            for shard in self._event_archives():
+                if len(events) >= limit:
+                    break
+                events.extend(self._read_archive(shard, query, [*params, limit - len(events)]))
+        return events
+
+    def _event_archives(self) -> list[Path]:
+        """Return the monthly event archive files, newest month first."""
+        return sorted(self.db_path.parent.glob("events_*.db"), reverse=True)
+
+    def _read_archive(self, shard: Path, query: str, params: list[Any]) -> list[Event]:
+        """Run an events query against one archive file, opened read-only."""
+        conn = sqlite3.connect(f"{shard.resolve().as_uri()}?mode=ro", uri=True)
+        conn.row_factory = sqlite3.Row
+        try:
+            return [Event.from_row(row) for row in conn.execute(query, params)]
+        except sqlite3.OperationalError:
+            # A shard archive_events is still creating has no table yet
+            return []
+        finally:
+            conn.close()
 
-        cursor = self.conn.execute(query, params)
-        return [Event.from_row(dict(row)) for row in cursor.fetchall()]
+    def archive_events(self, before: datetime) -> int:
+        """Move events older than `before` into monthly archive databases.
+
+        Each month goes to its own events_YYYY_MM.db file next to the main
+        database. This keeps the live events table small, and old history can
+        be dropped by deleting a file instead of DELETE + VACUUM.
+        Returns the number of events archived.
+        """
+        before_iso = before.isoformat()
+        conn = self.conn
+        cursor = conn.execute(
+            "SELECT DISTINCT substr(timestamp, 1, 7) AS month FROM events WHERE timestamp < ?",
+            (before_iso,)
+        )
+        months = [row["month"] for row in cursor.fetchall()]
+
+        archived = 0
+        for month in months:
+            shard = self.db_path.parent / f"events_{month.replace('-', '_')}.db"
+            # ATTACH is not allowed inside a transaction
+            conn.execute("ATTACH DATABASE ? AS archive", (str(shard),))
+            try:
+                # Copy and delete commit separately: with main in WAL mode a
+                # transaction spanning the attached file is not atomic, and a
+                # crash between its two commits could lose the rows. Once the
+                # copy is durable, a retry only repeats the cleanup.
+                with self.transaction():
+                    conn.execute(
+                        """
+                        CREATE TABLE IF NOT EXISTS archive.events (
+                            id INTEGER PRIMARY KEY,
+                            timestamp TEXT NOT NULL,
+                            event_type TEXT NOT NULL,
+                            agent_id TEXT,
+                            task_id TEXT,
+                            details TEXT
+                        )
+                        """
+                    )
+                    # OR IGNORE keeps a retry idempotent if an earlier run
+                    # copied rows but did not get to delete them
+                    conn.execute(
+                        """
+                        INSERT OR IGNORE INTO archive.events
+                        SELECT * FROM main.events
+                        WHERE timestamp < ? AND substr(timestamp, 1, 7) = ?
+                        """,
+                        (before_iso, month)
+                    )
+                with self.transaction():
+                    # Only delete rows the archive is known to hold
+                    cursor = conn.execute(
+                        """
+                        DELETE FROM main.events
+                        WHERE timestamp < ? AND substr(timestamp, 1, 7) = ?
+                        AND id IN (SELECT id FROM archive.events)
+                        """,
+                        (before_iso, month)
+                    )
+                    archived += cursor.rowcount
+            finally:
+                conn.execute("DETACH DATABASE archive")
+        return archived
 
     # =========================================================================
     # File Lock Operations
@@ -902,16 +1230,17 @@ class Database:
 
     def lock_file(self, file_path: str, agent_id: str) -> bool:
         """Lock a file for exclusive access. Returns True if successful."""
-        now = _utc_now_naive().isoformat()
+        now = utc_now_naive().isoformat()
         try:
-            self.conn.execute(
-                """
-                INSERT INTO file_locks (file_path, agent_id, locked_at)
-                VALUES (?, ?, ?)
-                """,
-                (file_path, agent_id, now)
-            )
-            self.log_event("file_locked", agent_id=agent_id, details={"file": file_path})
+            with self.transaction() as conn:
+                conn.execute(
+                    """
+                    INSERT INTO file_locks (file_path, agent_id, locked_at)
+                    VALUES (?, ?, ?)
+                    """,
+                    (file_path, agent_id, now)
+                )
+                self.log_event("file_locked", agent_id=agent_id, details={"file": file_path})
             return True
         except sqlite3.IntegrityError:
             # Already locked
@@ -919,14 +1248,15 @@ class Database:
 
     def unlock_file(self, file_path: str, agent_id: str) -> bool:
         """Unlock a file. Only the locking agent can unlock."""
-        cursor = self.conn.execute(
-            "DELETE FROM file_locks WHERE file_path = ? AND agent_id = ?",
-            (file_path, agent_id)
-        )
-        if cursor.rowcount == 1:
-            self.log_event("file_unlocked", agent_id=agent_id, details={"file": file_path})
-            return True
-        return False
+        with self.transaction() as conn:
+            cursor = conn.execute(
+                "DELETE FROM file_locks WHERE file_path = ? AND agent_id = ?",
+                (file_path, agent_id)
+            )
+            if cursor.rowcount == 1:
+                self.log_event("file_unlocked", agent_id=agent_id, details={"file": file_path})
+                return True
+            return False
 
     def get_file_lock(self, file_path: str) -> dict | None:
         """Get lock info for a file."""
@@ -977,14 +1307,22 @@ def get_db(project_dir: Path) -> Database:
 
 def _run_migrations(db: Database) -> None:
     """Run any pending database migrations."""
-    try:
-        cursor = db.conn.execute("SELECT version FROM schema_version LIMIT 1")
-        row = cursor.fetchone()
-        current_version = row["version"] if row else 0
-    except Exception:
-        # Table doesn't exist yet
+    # Reading the header field needs no table lookup, so the common
+    # already-current case costs a single PRAGMA.
+    current_version = db.conn.execute("PRAGMA user_version").fetchone()[0]
+    if current_version >= SCHEMA_VERSION:
         return
 
+    if current_version == 0:
+        # Databases created before v5 tracked their version in a table
+        try:
+            cursor = db.conn.execute("SELECT MAX(version) AS version FROM schema_version")
+            row = cursor.fetchone()
+            current_version = row["version"] or 0
+        except Exception:
+            # Table doesn't exist yet
+            return
+
     # Migration from v1 to v2: add last_progress and role columns to agents
     if current_version < 2:
         try:
@@ -995,7 +1333,7 @@ def _run_migrations(db: Database) -> None:
             db.conn.execute("ALTER TABLE agents ADD COLUMN role TEXT")
         except Exception:
             pass  # Column might already exist
-        db.conn.execute("UPDATE schema_version SET version = 2")
+        db.conn.execute("PRAGMA user_version = 2")
         current_version = 2
 
     # Migration from v2 to v3: add depends_on column to tasks
@@ -1004,7 +1342,7 @@ def _run_migrations(db: Database) -> None:
             db.conn.execute("ALTER TABLE tasks ADD COLUMN depends_on TEXT")
         except Exception:
             pass  # Column might already exist
-        db.conn.execute("UPDATE schema_version SET version = 3")
+        db.conn.execute("PRAGMA user_version = 3")
         current_version = 3
 
     # Migration from v3 to v4: add reply_to column to messages
@@ -1017,7 +1355,41 @@ def _run_migrations(db: Database) -> None:
             db.conn.execute("CREATE INDEX IF NOT EXISTS idx_messages_reply_to ON messages(reply_to)")
         except Exception:
             pass
-        db.conn.execute("UPDATE schema_version SET version = 4")
+        db.conn.execute("PRAGMA user_version = 4")
+        current_version = 4
+
+    # Migration from v4 to v5: normalize task tags into task_tags
+    if current_version < 5:
+        db.conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS task_tags (
+                task_id TEXT NOT NULL,
+                tag TEXT NOT NULL,
+                PRIMARY KEY (task_id, tag)
+            );
+            CREATE INDEX IF NOT EXISTS idx_task_tags_tag ON task_tags(tag);
+            INSERT OR IGNORE INTO task_tags (task_id, tag)
+                SELECT tasks.id, tag.value FROM tasks, json_each(tasks.tags) AS tag
+                WHERE tasks.tags IS NOT NULL;
+            """
+        )
+        db.conn.execute("PRAGMA user_version = 5")
+
+    # Create any tables added since the database was made; init_schema
+    # skips the script once user_version is current.
+    db.conn.executescript(SCHEMA)
+    _stamp_schema_version(db.conn)
+
+
+def _stamp_schema_version(conn: sqlite3.Connection) -> None:
+    """Record SCHEMA_VERSION in both version markers.
+
+    This version reads PRAGMA user_version. Older aqua processes sharing
+    the same database read the schema_version table, and their doctor
+    check fails without it, so the table is kept up to date as well.
+    """
+    conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+    conn.execute("INSERT OR IGNORE INTO schema_version (version) VALUES (?)", (SCHEMA_VERSION,))
 
 
 def init_db(project_dir: Path) -> Database:
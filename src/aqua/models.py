@@ -1,9 +1,18 @@
 """Data models for Aqua."""
 
-import json
+import sqlite3
+import time
 from dataclasses import dataclass, field
 from datetime import datetime, timezone
 from enum import Enum
+from functools import lru_cache
+from typing import cast
+
+from aqua.utils import json_loads, pinned_now, utc_now_naive
+
+# from_row indexes columns by name, which sqlite3.Row supports directly,
+# so callers need not copy each row into a dict first.
+Row = sqlite3.Row | dict
 
 
 def _utc_now_naive() -> datetime:
@@ -11,8 +20,50 @@ def _utc_now_naive() -> datetime:
 
     This is used for default field values to maintain compatibility with
     existing database storage which uses naive datetime strings.
+    Inside utils.batch_now() it returns the batch's pinned timestamp.
+    """
+    pinned = pinned_now()
+    if pinned is not None:
+        return pinned
+    return utc_now_naive()
+
+
+@lru_cache(maxsize=4096)
+def _parse_iso(value: str) -> datetime:
+    """Parse an ISO timestamp from the database.
+
+    Rows fetched together share many timestamps (batch inserts, repeated
+    polling of the same rows), so parses are memoized. datetime is
+    immutable, which makes sharing the cached instances safe.
+    """
+    return datetime.fromisoformat(value)
+
+
+def _parse_iso_optional(value: str | None) -> datetime | None:
+    """Parse a nullable ISO timestamp column."""
+    return _parse_iso(value) if value else None
+
+
+@lru_cache(maxsize=4096)
+def _format_naive_iso(value: datetime) -> str:
+    """Memoized isoformat for naive datetimes."""
+    return value.isoformat()
+
+
+def _format_iso(value: datetime) -> str:
+    """Format a timestamp for to_dict, memoizing the naive UTC values we store.
+
+    Aware datetimes bypass the cache: equal instants in different zones
+    hash alike but format differently.
     """
-    return datetime.now(timezone.utc).replace(tzinfo=None)
+    if value.tzinfo is None:
+        return _format_naive_iso(value)
+    return value.isoformat()
+
+
+def _format_iso_optional(value: datetime | None) -> str | None:
+    """Format a nullable timestamp for to_dict."""
+    return _format_iso(value) if value else None
 
 
 class AgentStatus(Enum):
@@ -39,7 +90,14 @@ class TaskStatus(Enum):
     ABANDONED = "abandoned"
 
 
-@dataclass
+# Value -> member maps used by from_row; a dict lookup skips the
+# validation machinery behind Enum.__call__ on every decoded row.
+_AGENT_STATUS = cast(dict[str, AgentStatus], AgentStatus._value2member_map_)
+_AGENT_TYPE = cast(dict[str, AgentType], AgentType._value2member_map_)
+_TASK_STATUS = cast(dict[str, TaskStatus], TaskStatus._value2member_map_)
+
+
+@dataclass(slots=True)
 class Agent:
     """An AI agent participating in the quorum."""
     id: str
@@ -63,8 +121,8 @@ class Agent:
             "agent_type": self.agent_type.value,
             "pid": self.pid,
             "status": self.status.value,
-            "last_heartbeat_at": self.last_heartbeat_at.isoformat(),
-            "registered_at": self.registered_at.isoformat(),
+            "last_heartbeat_at": _format_iso(self.last_heartbeat_at),
+            "registered_at": _format_iso(self.registered_at),
             "current_task_id": self.current_task_id,
             "capabilities": self.capabilities,
             "metadata": self.metadata,
@@ -73,25 +131,25 @@ class Agent:
         }
 
     @classmethod
-    def from_row(cls, row: dict) -> "Agent":
+    def from_row(cls, row: Row) -> "Agent":
         """Create Agent from database row."""
         return cls(
             id=row["id"],
             name=row["name"],
-            agent_type=AgentType(row["agent_type"]),
+            agent_type=_AGENT_TYPE[row["agent_type"]],
             pid=row["pid"],
-            status=AgentStatus(row["status"]),
-            last_heartbeat_at=datetime.fromisoformat(row["last_heartbeat_at"]),
-            registered_at=datetime.fromisoformat(row["registered_at"]),
+            status=_AGENT_STATUS[row["status"]],
+            last_heartbeat_at=_parse_iso(row["last_heartbeat_at"]),
+            registered_at=_parse_iso(row["registered_at"]),
             current_task_id=row["current_task_id"],
-            capabilities=json.loads(row["capabilities"]) if row["capabilities"] else [],
-            metadata=json.loads(row["metadata"]) if row["metadata"] else {},
-            last_progress=row.get("last_progress"),
-            role=row.get("role"),
+            capabilities=json_loads(row["capabilities"]) if row["capabilities"] else [],
+            metadata=json_loads(row["metadata"]) if row["metadata"] else {},
+            last_progress=row["last_progress"],
+            role=row["role"],
         )
 
 
-@dataclass
+@dataclass(slots=True)
 class Task:
     """A work item to be claimed and executed."""
     id: str
@@ -126,10 +184,10 @@ class Task:
             "created_by": self.created_by,
             "claimed_by": self.claimed_by,
             "claim_term": self.claim_term,
-            "created_at": self.created_at.isoformat(),
-            "updated_at": self.updated_at.isoformat(),
-            "claimed_at": self.claimed_at.isoformat() if self.claimed_at else None,
-            "completed_at": self.completed_at.isoformat() if self.completed_at else None,
+            "created_at": _format_iso(self.created_at),
+            "updated_at": _format_iso(self.updated_at),
+            "claimed_at": _format_iso_optional(self.claimed_at),
+            "completed_at": _format_iso_optional(self.completed_at),
             "result": self.result,
             "error": self.error,
             "retry_count": self.retry_count,
@@ -141,33 +199,33 @@ class Task:
         }
 
     @classmethod
-    def from_row(cls, row: dict) -> "Task":
+    def from_row(cls, row: Row) -> "Task":
         """Create Task from database row."""
         return cls(
             id=row["id"],
             title=row["title"],
             description=row["description"],
-            status=TaskStatus(row["status"]),
+            status=_TASK_STATUS[row["status"]],
             priority=row["priority"],
             created_by=row["created_by"],
             claimed_by=row["claimed_by"],
             claim_term=row["claim_term"],
-            created_at=datetime.fromisoformat(row["created_at"]),
-            updated_at=datetime.fromisoformat(row["updated_at"]),
-            claimed_at=datetime.fromisoformat(row["claimed_at"]) if row["claimed_at"] else None,
-            completed_at=datetime.fromisoformat(row["completed_at"]) if row["completed_at"] else None,
+            created_at=_parse_iso(row["created_at"]),
+            updated_at=_parse_iso(row["updated_at"]),
+            claimed_at=_parse_iso_optional(row["claimed_at"]),
+            completed_at=_parse_iso_optional(row["completed_at"]),
             result=row["result"],
             error=row["error"],
             retry_count=row["retry_count"],
             max_retries=row["max_retries"],
-            tags=json.loads(row["tags"]) if row["tags"] else [],
+            tags=json_loads(row["tags"]) if row["tags"] else [],
             context=row["context"],
             version=row["version"],
-            depends_on=json.loads(row["depends_on"]) if row.get("depends_on") else [],
+            depends_on=json_loads(row["depends_on"]) if row["depends_on"] else [],
         )
 
 
-@dataclass
+@dataclass(slots=True)
 class Message:
     """A message between agents."""
     id: int
@@ -187,13 +245,13 @@ class Message:
             "to_agent": self.to_agent,
             "content": self.content,
             "message_type": self.message_type,
-            "created_at": self.created_at.isoformat(),
-            "read_at": self.read_at.isoformat() if self.read_at else None,
+            "created_at": _format_iso(self.created_at),
+            "read_at": _format_iso_optional(self.read_at),
             "reply_to": self.reply_to,
         }
 
     @classmethod
-    def from_row(cls, row: dict) -> "Message":
+    def from_row(cls, row: Row) -> "Message":
         """Create Message from database row."""
         return cls(
             id=row["id"],
@@ -201,45 +259,62 @@ class Message:
             to_agent=row["to_agent"],
             content=row["content"],
             message_type=row["message_type"],
-            created_at=datetime.fromisoformat(row["created_at"]),
-            read_at=datetime.fromisoformat(row["read_at"]) if row["read_at"] else None,
-            reply_to=row.get("reply_to"),
+            created_at=_parse_iso(row["created_at"]),
+            read_at=_parse_iso_optional(row["read_at"]),
+            reply_to=row["reply_to"],
         )
 
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class Leader:
-    """Current leader information."""
+    """Current leader information.
+
+    Frozen, so the cached lease epoch cannot drift from lease_expires_at.
+    """
     agent_id: str
     term: int
     lease_expires_at: datetime
     elected_at: datetime
+    # Lease expiry as a Unix timestamp, so is_expired is a float compare
+    _lease_expires_epoch: float = field(init=False, repr=False, compare=False)
+
+    def __post_init__(self) -> None:
+        # Stored datetimes are naive UTC
+        epoch = self.lease_expires_at.replace(tzinfo=timezone.utc).timestamp()
+        object.__setattr__(self, "_lease_expires_epoch", epoch)
 
     def to_dict(self) -> dict:
         """Convert to dictionary for JSON serialization."""
         return {
             "agent_id": self.agent_id,
             "term": self.term,
-            "lease_expires_at": self.lease_expires_at.isoformat(),
-            "elected_at": self.elected_at.isoformat(),
+            "lease_expires_at": _format_iso(self.lease_expires_at),
+            "elected_at": _format_iso(self.elected_at),
         }
 
     @classmethod
-    def from_row(cls, row: dict) -> "Leader":
+    def from_row(cls, row: Row) -> "Leader":
         """Create Leader from database row."""
         return cls(
             agent_id=row["agent_id"],
             term=row["term"],
-            lease_expires_at=datetime.fromisoformat(row["lease_expires_at"]),
-            elected_at=datetime.fromisoformat(row["elected_at"]),
+            lease_expires_at=_parse_iso(row["lease_expires_at"]),
+            elected_at=_parse_iso(row["elected_at"]),
         )
 
-    def is_expired(self) -> bool:
-        """Check if the leader's lease has expired."""
-        return _utc_now_naive() > self.lease_expires_at
+    def is_expired(self, now: datetime | None = None) -> bool:
+        """Check if the leader's lease has expired, as of `now` if given.
+
+        Without `now` this reads the system clock (time.time), not a
+        Database's injected clock; pass that clock's time to compare
+        against it instead.
+        """
+        if now is None:
+            return time.time() > self._lease_expires_epoch
+        return now > self.lease_expires_at
 
 
-@dataclass
+@dataclass(slots=True)
 class Event:
     """An audit log event."""
     id: int
@@ -253,7 +328,7 @@ class Event:
         """Convert to dictionary for JSON serialization."""
         return {
             "id": self.id,
-            "timestamp": self.timestamp.isoformat(),
+            "timestamp": _format_iso(self.timestamp),
             "event_type": self.event_type,
             "agent_id": self.agent_id,
             "task_id": self.task_id,
@@ -261,13 +336,13 @@ class Event:
         }
 
     @classmethod
-    def from_row(cls, row: dict) -> "Event":
+    def from_row(cls, row: Row) -> "Event":
         """Create Event from database row."""
         return cls(
             id=row["id"],
-            timestamp=datetime.fromisoformat(row["timestamp"]),
+            timestamp=_parse_iso(row["timestamp"]),
             event_type=row["event_type"],
             agent_id=row["agent_id"],
             task_id=row["task_id"],
-            details=json.loads(row["details"]) if row["details"] else {},
+            details=json_loads(row["details"]) if row["details"] else {},
         )
@@ -1,36 +1,48 @@
 """Utility functions for Aqua."""
 
+import json
 import os
 import random
-import uuid
+from bisect import bisect_right
+from collections.abc import Callable, Iterable, Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
 from datetime import datetime, timezone
+from enum import Enum
+from secrets import token_hex
+from typing import Any
+
+try:
+    import orjson
+except ImportError:  # Optional speedup, see the "fast" extra
+    orjson = None  # type: ignore[assignment]
 
 # Adjectives and nouns for generating memorable agent names
-ADJECTIVES = [
+ADJECTIVES = (
     "brave", "calm", "dark", "eager", "fair", "gentle", "happy", "idle",
     "jolly", "keen", "lively", "merry", "noble", "odd", "proud", "quick",
     "rapid", "silent", "tall", "unique", "vivid", "warm", "young", "zesty",
     "amber", "blue", "coral", "dusty", "emerald", "frosty", "golden", "hazy",
-]
+)
 
-NOUNS = [
+NOUNS = (
     "falcon", "tiger", "eagle", "wolf", "bear", "lion", "hawk", "fox",
     "otter", "raven", "shark", "whale", "cobra", "crane", "drake", "elk",
     "finch", "gecko", "heron", "ibis", "jay", "koala", "lemur", "moose",
     "newt", "owl", "panda", "quail", "robin", "swan", "trout", "viper",
-]
+)
+
+_choice = random.choice
 
 
 def generate_short_id() -> str:
     """Generate a short unique ID (8 characters)."""
-    return uuid.uuid4().hex[:8]
+    return token_hex(4)
 
 
 def generate_agent_name() -> str:
     """Generate a memorable agent name like 'brave-falcon'."""
-    adjective = random.choice(ADJECTIVES)
-    noun = random.choice(NOUNS)
-    return f"{adjective}-{noun}"
+    return f"{_choice(ADJECTIVES)}-{_choice(NOUNS)}"
 
 
 def process_exists(pid: int) -> bool:
@@ -42,6 +54,22 @@ def process_exists(pid: int) -> bool:
         return False
 
 
+def live_pids(pids: Iterable[int]) -> set[int]:
+    """Return the subset of pids that belong to running processes.
+
+    On Linux one /proc listing answers for every pid at once; elsewhere
+    each pid is probed with process_exists.
+    """
+    pids = set(pids)
+    if not pids:
+        return pids
+    try:
+        running = {int(name) for name in os.listdir("/proc") if name.isdigit()}
+    except OSError:
+        return {pid for pid in pids if process_exists(pid)}
+    return pids & running
+
+
 def get_current_pid() -> int:
     """Get the current process ID."""
     return os.getpid()
@@ -56,6 +84,43 @@ def utc_now() -> datetime:
     return datetime.now(timezone.utc)
 
 
+def utc_now_naive() -> datetime:
+    """Get current UTC time as a naive datetime.
+
+    The database stores naive UTC ISO strings, so values read back from it
+    compare against this rather than against utc_now().
+    """
+    return utc_now().replace(tzinfo=None)
+
+
+_BATCH_NOW: ContextVar[datetime | None] = ContextVar("aqua_batch_now", default=None)
+
+
+@contextmanager
+def batch_now() -> Iterator[datetime]:
+    """Pin a single naive UTC timestamp for models created inside the block.
+
+    Timestamp fields of models built in a batch default to the pinned
+    value instead of reading the clock once per instance. Nested blocks
+    keep the outermost timestamp.
+    """
+    pinned = _BATCH_NOW.get()
+    if pinned is not None:
+        yield pinned
+        return
+    pinned = utc_now_naive()
+    token = _BATCH_NOW.set(pinned)
+    try:
+        yield pinned
+    finally:
+        _BATCH_NOW.reset(token)
+
+
+def pinned_now() -> datetime | None:
+    """Return the timestamp pinned by an enclosing batch_now(), if any."""
+    return _BATCH_NOW.get()
+
+
 def now_iso() -> str:
     """Get current UTC time as ISO8601 string."""
     return utc_now().isoformat()
@@ -70,30 +135,82 @@ def parse_iso(iso_string: str) -> datetime:
     return datetime.fromisoformat(iso_string)
 
 
-def format_time_ago(dt: datetime) -> str:
-    """Format a datetime as 'X ago' relative to now."""
-    # Handle both timezone-aware and naive datetimes
-    now = utc_now()
-    if dt.tzinfo is None:
-        # Naive datetime - assume UTC
-        now = now.replace(tzinfo=None)
-    delta = now - dt
+# format_time_ago buckets: an age below _TIME_AGO_LIMITS[i] is shown in
+# _TIME_AGO_UNITS[i]; anything older falls through to days.
+_TIME_AGO_LIMITS = (60, 3600, 86400)
+_TIME_AGO_UNITS = ((1, "s"), (60, "m"), (3600, "h"), (86400, "d"))
 
-    seconds = int(delta.total_seconds())
 
+def _format_age(seconds: int) -> str:
+    """Format an age in whole seconds as 'X ago'."""
     if seconds < 0:
         return "in the future"
-    elif seconds < 60:
-        return f"{seconds}s ago"
-    elif seconds < 3600:
-        minutes = seconds // 60
-        return f"{minutes}m ago"
-    elif seconds < 86400:
-        hours = seconds // 3600
-        return f"{hours}h ago"
-    else:
-        days = seconds // 86400
-        return f"{days}d ago"
+    divisor, suffix = _TIME_AGO_UNITS[bisect_right(_TIME_AGO_LIMITS, seconds)]
+    return f"{seconds // divisor}{suffix} ago"
+
+
+def format_time_ago(dt: datetime) -> str:
+    """Format a datetime as 'X ago' relative to now."""
+    return format_times_ago((dt,))[0]
+
+
+def format_times_ago(dts: Iterable[datetime]) -> list[str]:
+    """Format several datetimes as 'X ago' against a single reading of now.
+
+    Used when rendering a table column, so every row shares one clock
+    read and the rows stay consistent with each other.
+    """
+    # Handle both timezone-aware and naive datetimes
+    now = utc_now()
+    naive_now = now.replace(tzinfo=None)  # Naive datetime - assume UTC
+    return [
+        _format_age(int(((naive_now if dt.tzinfo is None else now) - dt).total_seconds()))
+        for dt in dts
+    ]
+
+
+def json_dumps(
+    obj: Any,
+    indent: bool = False,
+    default: Callable[[Any], Any] | None = None,
+) -> str:
+    """Serialize to a JSON string, using orjson when it is installed.
+
+    Args:
+        obj: Value to serialize
+        indent: If True, pretty-print with two-space indentation
+        default: Fallback for objects neither encoder handles natively
+    """
+    if orjson is not None:
+        # Hand datetimes and dataclasses to `default` as json does, so the
+        # output does not depend on whether orjson is installed. orjson
+        # always encodes enums by value; the json path matches that.
+        option = (
+            orjson.OPT_NON_STR_KEYS
+            | orjson.OPT_PASSTHROUGH_DATETIME
+            | orjson.OPT_PASSTHROUGH_DATACLASS
+            | (orjson.OPT_INDENT_2 if indent else 0)
+        )
+        return orjson.dumps(obj, default=default, option=option).decode()
+    return json.dumps(obj, indent=2 if indent else None, default=_enum_default(default))
+
+
+def _enum_default(default: Callable[[Any], Any] | None) -> Callable[[Any], Any]:
+    """Wrap a json `default` to encode enums by value, as orjson always does."""
+    def encode(value: Any) -> Any:
+        if isinstance(value, Enum):
+            return value.value
+        if default is None:
+            raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+        return default(value)
+    return encode
+
+
+def json_loads(data: str | bytes) -> Any:
+    """Parse a JSON document, using orjson when it is installed."""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
 
 
 def truncate(text: str, max_length: int = 50, suffix: str = "...") -> str:
@@ -107,4 +224,4 @@ def parse_tags(tags_str: str | None) -> list:
     """Parse comma-separated tags string into list."""
     if not tags_str:
         return []
-    return [t.strip() for t in tags_str.split(",") if t.strip()]
+    return [tag for tag in map(str.strip, tags_str.split(",")) if tag]
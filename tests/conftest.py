@@ -1,15 +1,18 @@
 """Pytest fixtures for Aqua tests."""
 
+import hashlib
 import os
+import shutil
 import tempfile
+from datetime import datetime, timedelta
 from pathlib import Path
 from typing import Generator
 
 import pytest
 
-from aqua.db import Database, init_db
+from aqua.db import SCHEMA, Database, init_db
 from aqua.models import Agent, Task, AgentType, TaskStatus
-from aqua.utils import generate_short_id
+from aqua.utils import generate_short_id, utc_now_naive
 
 
 @pytest.fixture
@@ -19,14 +22,99 @@ def temp_project() -> Generator[Path, None, None]:
         yield Path(tmpdir)
 
 
+def pytest_addoption(parser: pytest.Parser) -> None:
+    parser.addoption(
+        "--reuse-db",
+        action="store_true",
+        help="Keep the session database in the temp dir and reuse it on later runs",
+    )
+    parser.addoption(
+        "--create-db",
+        action="store_true",
+        help="With --reuse-db, rebuild the kept database before the run",
+    )
+
+
+def _reused_project_dir(config: pytest.Config) -> Path:
+    """Pick the --reuse-db directory for this checkout, schema and worker.
+
+    The name hashes the project root and the schema script, so other
+    checkouts never share a file and a schema edit gets a fresh one even
+    without a SCHEMA_VERSION bump. Each xdist worker gets its own file so
+    they never contend for the write lock.
+    """
+    key = f"{config.rootpath}\0{SCHEMA}".encode()
+    digest = hashlib.sha256(key).hexdigest()[:12]
+    worker = os.environ.get("PYTEST_XDIST_WORKER", "main")
+    return Path(tempfile.gettempdir()) / f"aqua_test_{digest}_{worker}"
+
+
+@pytest.fixture(scope="session")
+def _schema_db(
+    request: pytest.FixtureRequest, tmp_path_factory: pytest.TempPathFactory
+) -> Generator[Database, None, None]:
+    """Create the schema once for the whole test session.
+
+    With --reuse-db the database is kept between runs and init_db skips
+    the schema when its user_version is current; --create-db rebuilds it.
+    """
+    if request.config.getoption("--reuse-db"):
+        project_dir = _reused_project_dir(request.config)
+        if request.config.getoption("--create-db"):
+            shutil.rmtree(project_dir, ignore_errors=True)
+        project_dir.mkdir(exist_ok=True)
+    else:
+        project_dir = tmp_path_factory.mktemp("aqua")
+    database = init_db(project_dir)
+    yield database
+    database.close()
+
+
 @pytest.fixture
-def db(temp_project: Path) -> Generator[Database, None, None]:
-    """Create a database in the temp project."""
+def db(_schema_db: Database) -> Generator[Database, None, None]:
+    """Share the session database, rolling back each test's writes.
+
+    The test runs inside a SAVEPOINT, so Database.transaction() joins it
+    and nothing is ever committed. Tests that need real commits, other
+    connections, ATTACH, or schema scripts use fresh_db instead.
+    """
+    conn = _schema_db.conn
+    conn.execute("SAVEPOINT test_case")
+    yield _schema_db
+    conn.execute("ROLLBACK TO test_case")
+    conn.execute("RELEASE test_case")
+
+
+@pytest.fixture
+def fresh_db(temp_project: Path) -> Generator[Database, None, None]:
+    """Create a database of its own in the temp project."""
     database = init_db(temp_project)
     yield database
     database.close()
 
 
+class FakeClock:
+    """A hand-driven stand-in for Database._now."""
+
+    def __init__(self, start: datetime):
+        self.now = start
+
+    def __call__(self) -> datetime:
+        return self.now
+
+    def advance(self, seconds: float) -> None:
+        self.now += timedelta(seconds=seconds)
+
+
+@pytest.fixture
+def fake_clock(db: Database) -> Generator[FakeClock, None, None]:
+    """Drive the db fixture's lease clock by hand instead of sleeping."""
+    clock = FakeClock(utc_now_naive())
+    db._now = clock
+    yield clock
+    db._now = utc_now_naive
+
+
 @pytest.fixture
 def sample_agent() -> Agent:
     """Create a sample agent."""
@@ -57,8 +145,7 @@ def db_with_agents(db: Database) -> Database:
         Agent(id=generate_short_id(), name="agent-2", agent_type=AgentType.CODEX, pid=1002),
         Agent(id=generate_short_id(), name="agent-3", agent_type=AgentType.GENERIC, pid=1003),
     ]
-    for agent in agents:
-        db.create_agent(agent)
+    db.create_agents_bulk(agents)
     return db
 
 
@@ -70,6 +157,5 @@ def db_with_tasks(db: Database) -> Database:
         Task(id=generate_short_id(), title="Medium priority task", priority=5),
         Task(id=generate_short_id(), title="Low priority task", priority=1),
     ]
-    for task in tasks:
-        db.create_task(task)
+    db.create_tasks_bulk(tasks)
     return db
@@ -1,12 +1,14 @@
 """Tests for coordinator and crash recovery."""
 
+import os
+import sqlite3
 import pytest
-from datetime import datetime, timedelta
+from datetime import timedelta
 
 from aqua.db import Database
 from aqua.coordinator import Coordinator
 from aqua.models import Agent, Task, AgentStatus, TaskStatus
-from aqua.utils import generate_short_id
+from aqua.utils import generate_short_id, utc_now_naive
 
 
 class TestTaskClaiming:
@@ -187,7 +189,7 @@ class TestCrashRecovery:
         db.claim_task(task.id, agent.id, term=1)
 
         # Simulate stale heartbeat
-        stale_time = (datetime.utcnow() - timedelta(seconds=120)).isoformat()
+        stale_time = (utc_now_naive() - timedelta(seconds=120)).isoformat()
         db.conn.execute(
             "UPDATE agents SET last_heartbeat_at = ? WHERE id = ?",
             (stale_time, agent.id)
@@ -220,6 +222,22 @@ class TestCrashRecovery:
         assert len(recovered) == 0
         assert db.get_agent(agent.id).status == AgentStatus.ACTIVE
 
+    def test_live_process_not_recovered(self, db: Database):
+        """Test an agent whose process is still running is only flagged."""
+        agent = Agent(id=generate_short_id(), name="agent-1", pid=os.getpid())
+        db.create_agent(agent)
+
+        stale_time = (utc_now_naive() - timedelta(seconds=120)).isoformat()
+        db.conn.execute(
+            "UPDATE agents SET last_heartbeat_at = ? WHERE id = ?",
+            (stale_time, agent.id)
+        )
+
+        coordinator = Coordinator(db, dead_threshold=60)
+        assert coordinator.recover_dead_agents() == []
+        assert db.get_agent(agent.id).status == AgentStatus.ACTIVE
+        assert db.get_events(event_type="agent_unresponsive")[0].agent_id == agent.id
+
     def test_recover_stale_tasks(self, db: Database):
         """Test recovering tasks that have been claimed too long."""
         agent = Agent(id=generate_short_id(), name="agent-1")
@@ -230,7 +248,7 @@ class TestCrashRecovery:
         db.claim_task(task.id, agent.id, term=1)
 
         # Simulate old claim time
-        old_time = (datetime.utcnow() - timedelta(minutes=60)).isoformat()
+        old_time = (utc_now_naive() - timedelta(minutes=60)).isoformat()
         db.conn.execute(
             "UPDATE tasks SET claimed_at = ? WHERE id = ?",
             (old_time, task.id)
@@ -286,3 +304,38 @@ class TestCrashRecovery:
         assert "dead_agents" in result
         assert "stale_tasks" in result
         assert "requeued_tasks" in result
+        assert "archived_events" in result
+
+    def test_run_recovery_survives_archive_failure(self, db: Database, monkeypatch):
+        """An archiving error is not raised after recovery has committed."""
+        def fail(before):
+            raise sqlite3.OperationalError("unable to open database")
+
+        monkeypatch.setattr(db, "archive_events", fail)
+        result = Coordinator(db).run_recovery()
+
+        assert result["archived_events"] == 0
+
+    def test_run_recovery_commits_once(self, fresh_db: Database):
+        """Recovery sweeps share one commit instead of one per write."""
+        agent = Agent(id=generate_short_id(), name="agent-1", pid=99999)
+        fresh_db.create_agent(agent)
+        for i in range(3):
+            task = Task(id=generate_short_id(), title=f"Task {i}")
+            fresh_db.create_task(task)
+            fresh_db.claim_task(task.id, agent.id, term=1)
+
+        stale_time = (utc_now_naive() - timedelta(seconds=120)).isoformat()
+        fresh_db.conn.execute(
+            "UPDATE agents SET last_heartbeat_at = ? WHERE id = ?",
+            (stale_time, agent.id)
+        )
+
+        statements = []
+        fresh_db.conn.set_trace_callback(statements.append)
+        result = Coordinator(fresh_db, dead_threshold=60).run_recovery()
+        fresh_db.conn.set_trace_callback(None)
+
+        assert result["dead_agents"] == [agent.id]
+        assert result["requeued_tasks"] == 3
+        assert statements.count("COMMIT") == 1
@@ -1,11 +1,14 @@
 """Tests for database operations."""
 
+import sqlite3
+import threading
+
 import pytest
 from datetime import datetime, timedelta
 
-from aqua.db import Database
+from aqua.db import SCHEMA_VERSION, Database, _run_migrations
 from aqua.models import Agent, Task, AgentStatus, AgentType, TaskStatus
-from aqua.utils import generate_short_id
+from aqua.utils import batch_now, generate_short_id, utc_now_naive
 
 
 class TestAgentOperations:
@@ -17,6 +20,14 @@ class TestAgentOperations:
         assert created.id == sample_agent.id
         assert created.name == sample_agent.name
 
+    def test_create_agents_bulk(self, db: Database):
+        """Test creating several agents at once."""
+        agents = [Agent(id=generate_short_id(), name=f"bulk-{i}") for i in range(3)]
+        db.create_agents_bulk(agents)
+
+        assert [a.name for a in db.get_all_agents()] == ["bulk-0", "bulk-1", "bulk-2"]
+        assert len(db.get_events(event_type="agent_joined")) == 3
+
     def test_get_agent(self, db: Database, sample_agent: Agent):
         """Test retrieving an agent."""
         db.create_agent(sample_agent)
@@ -63,6 +74,19 @@ class TestAgentOperations:
 
         assert updated.last_heartbeat_at >= original.last_heartbeat_at
 
+    def test_get_stale_agents(self, db_with_agents: Database):
+        """Test only active agents with old heartbeats are reported stale."""
+        stale, dead, fresh = db_with_agents.get_all_agents()
+        old_time = (utc_now_naive() - timedelta(minutes=10)).isoformat()
+        db_with_agents.conn.execute(
+            "UPDATE agents SET last_heartbeat_at = ? WHERE id IN (?, ?)",
+            (old_time, stale.id, dead.id)
+        )
+        db_with_agents.update_agent_status(dead.id, AgentStatus.DEAD)
+
+        threshold = utc_now_naive() - timedelta(minutes=5)
+        assert [a.id for a in db_with_agents.get_stale_agents(threshold)] == [stale.id]
+
     def test_update_agent_status(self, db: Database, sample_agent: Agent):
         """Test updating agent status."""
         db.create_agent(sample_agent)
@@ -72,6 +96,25 @@ class TestAgentOperations:
 
         assert updated.status == AgentStatus.DEAD
 
+    def test_touch_agent(self, db: Database, sample_agent: Agent):
+        """Test touching an agent updates only the fields that are passed."""
+        db.create_agent(sample_agent)
+        original = db.get_agent(sample_agent.id)
+
+        db.touch_agent(sample_agent.id, current_task_id="task-1")
+        touched = db.get_agent(sample_agent.id)
+        assert touched.current_task_id == "task-1"
+        assert touched.status == AgentStatus.ACTIVE
+        assert touched.last_heartbeat_at >= original.last_heartbeat_at
+
+        db.touch_agent(sample_agent.id, status=AgentStatus.IDLE)
+        touched = db.get_agent(sample_agent.id)
+        assert touched.current_task_id == "task-1"
+        assert touched.status == AgentStatus.IDLE
+
+        db.touch_agent(sample_agent.id, current_task_id=None)
+        assert db.get_agent(sample_agent.id).current_task_id is None
+
     def test_delete_agent(self, db: Database, sample_agent: Agent):
         """Test deleting an agent."""
         db.create_agent(sample_agent)
@@ -90,6 +133,51 @@ class TestTaskOperations:
         assert created.id == sample_task.id
         assert created.title == sample_task.title
 
+    def test_create_tasks_bulk(self, db: Database):
+        """Test creating several tasks at once."""
+        tasks = [
+            Task(id="bulk-a", title="Bulk A", tags=["backend"]),
+            Task(id="bulk-b", title="Bulk B", depends_on=["bulk-a"]),
+        ]
+        db.create_tasks_bulk(tasks)
+
+        assert db.get_task("bulk-a").tags == ["backend"]
+        assert db.get_task("bulk-b").depends_on == ["bulk-a"]
+        assert len(db.get_events(event_type="task_created")) == 2
+
+    def test_bulk_tasks_keep_fifo_order(self, db: Database):
+        """Test same-priority tasks from one batch come out in insertion order."""
+        db.create_tasks_bulk([Task(id=f"fifo-{c}", title=c) for c in "cba"])
+
+        assert [t.id for t in db.get_all_tasks()] == ["fifo-c", "fifo-b", "fifo-a"]
+        assert db.get_next_pending_task().id == "fifo-c"
+
+    def test_bulk_insert_uses_pinned_timestamp(self, db: Database):
+        """Test single and bulk inserts store the timestamp pinned by batch_now()."""
+        with batch_now() as pinned:
+            tasks = [Task(id=f"pin-{i}", title="Pinned") for i in range(2)]
+            db.create_tasks_bulk(tasks)
+            db.create_task(Task(id="pin-single", title="Pinned"))
+            db.create_agent(Agent(id="pin-agent", name="pinned"))
+
+        stored = {t.created_at for t in db.get_all_tasks()}
+        assert stored == {pinned} == {t.created_at for t in tasks}
+        assert db.get_agent("pin-agent").registered_at == pinned
+
+    def test_empty_json_fields_stored_as_null(self, db: Database, sample_task: Task):
+        """Test empty tags/dependencies are stored as NULL and read back empty."""
+        db.create_task(sample_task)
+
+        row = db.conn.execute(
+            "SELECT tags, depends_on FROM tasks WHERE id = ?", (sample_task.id,)
+        ).fetchone()
+        assert row["tags"] is None
+        assert row["depends_on"] is None
+
+        retrieved = db.get_task(sample_task.id)
+        assert retrieved.tags == []
+        assert retrieved.depends_on == []
+
     def test_get_task(self, db: Database, sample_task: Task):
         """Test retrieving a task."""
         db.create_task(sample_task)
@@ -111,12 +199,92 @@ class TestTaskOperations:
         done = db_with_tasks.get_all_tasks(status=TaskStatus.DONE)
         assert len(done) == 0
 
+    def test_get_all_tasks_filtered_by_tag(self, db: Database):
+        """Test filtering tasks by tag matches whole tags only."""
+        db.create_task(Task(id="t-front", title="Frontend", tags=["frontend", "ui"]))
+        db.create_task(Task(id="t-back", title="Backend", tags=["backend"]))
+        db.create_task(Task(id="t-none", title="Untagged"))
+
+        assert [t.id for t in db.get_all_tasks(tag="ui")] == ["t-front"]
+        assert [t.id for t in db.get_all_tasks(tag="backend")] == ["t-back"]
+        assert db.get_all_tasks(tag="end") == []
+
+    def test_tag_filter_sees_json_only_writers(self, db: Database):
+        """Test tasks written without task_tags rows still match tag filters."""
+        # Older aqua versions insert and update only the JSON tags column
+        db.conn.execute(
+            "INSERT INTO tasks (id, title, created_at, updated_at, tags)"
+            " VALUES ('t-old', 'Old writer', '2025-01-01T00:00:00', '2025-01-01T00:00:00', ?)",
+            ('["backend"]',)
+        )
+        assert [t.id for t in db.get_all_tasks(tag="backend")] == ["t-old"]
+
+        db.conn.execute("UPDATE tasks SET tags = '[\"frontend\"]' WHERE id = 't-old'")
+        assert db.get_all_tasks(tag="backend") == []
+        assert [t.id for t in db.get_all_tasks(tag="frontend")] == ["t-old"]
+
+    def test_migration_backfills_task_tags(self, fresh_db: Database):
+        """Test upgrading from v4 copies existing JSON tags into task_tags."""
+        fresh_db.create_task(Task(id="t-old", title="Old task", tags=["backend", "api"]))
+        fresh_db.conn.execute("DROP TABLE task_tags")
+        fresh_db.conn.execute("PRAGMA user_version = 4")
+
+        _run_migrations(fresh_db)
+
+        assert [t.id for t in fresh_db.get_all_tasks(tag="api")] == ["t-old"]
+
+    def test_migration_from_schema_version_table(self, fresh_db: Database):
+        """Test databases versioned by the legacy schema_version table are upgraded."""
+        fresh_db.conn.execute("PRAGMA user_version = 0")
+        fresh_db.conn.execute("DELETE FROM schema_version")
+        fresh_db.conn.execute("INSERT INTO schema_version (version) VALUES (4)")
+
+        _run_migrations(fresh_db)
+
+        assert fresh_db.conn.execute("PRAGMA user_version").fetchone()[0] == SCHEMA_VERSION
+        # Older aqua processes on the same file still find their marker
+        row = fresh_db.conn.execute("SELECT MAX(version) FROM schema_version").fetchone()
+        assert row[0] == SCHEMA_VERSION
+
+    def test_init_schema_keeps_newer_version(self, fresh_db: Database):
+        """Test a database stamped by a newer aqua is not downgraded."""
+        fresh_db.conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION + 1}")
+
+        fresh_db.init_schema()
+
+        assert fresh_db.conn.execute("PRAGMA user_version").fetchone()[0] == SCHEMA_VERSION + 1
+
+    def test_init_schema_skips_current_database(self, fresh_db: Database):
+        """Test the schema script only runs when user_version is behind."""
+        fresh_db.conn.execute("DROP TABLE file_locks")
+        fresh_db.init_schema()
+        tables = {row[0] for row in fresh_db.conn.execute("SELECT name FROM sqlite_master")}
+        assert "file_locks" not in tables
+
+        fresh_db.conn.execute("PRAGMA user_version = 0")
+        fresh_db.init_schema()
+        tables = {row[0] for row in fresh_db.conn.execute("SELECT name FROM sqlite_master")}
+        assert "file_locks" in tables
+
     def test_get_next_pending_task_priority(self, db_with_tasks: Database):
         """Test getting next task respects priority."""
         task = db_with_tasks.get_next_pending_task()
         assert task is not None
         assert task.priority == 10  # Highest priority
 
+    def test_get_next_pending_task_skips_blocked(self, db: Database, sample_agent: Agent):
+        """Test tasks with unfinished or missing dependencies are skipped."""
+        db.create_agent(sample_agent)
+        db.create_task(Task(id="dep", title="Dep", priority=1))
+        db.create_task(Task(id="blocked", title="Blocked", priority=10, depends_on=["dep"]))
+        db.create_task(Task(id="orphan", title="Orphan", priority=9, depends_on=["gone"]))
+
+        assert db.get_next_pending_task().id == "dep"
+
+        db.claim_task("dep", sample_agent.id, term=1)
+        db.complete_task("dep", sample_agent.id)
+        assert db.get_next_pending_task().id == "blocked"
+
     def test_claim_task(self, db: Database, sample_agent: Agent, sample_task: Task):
         """Test claiming a task."""
         db.create_agent(sample_agent)
@@ -185,6 +353,22 @@ class TestTaskOperations:
         assert task.status == TaskStatus.ABANDONED
         assert task.claimed_by is None
 
+    def test_get_blocking_dependencies(self, db: Database, sample_agent: Agent):
+        """Test only incomplete dependencies are reported, in dependency order."""
+        db.create_agent(sample_agent)
+        dep_a = Task(id="dep-a", title="Dep A")
+        dep_b = Task(id="dep-b", title="Dep B")
+        dep_c = Task(id="dep-c", title="Dep C")
+        db.create_tasks_bulk([dep_a, dep_b, dep_c])
+        db.claim_task(dep_b.id, sample_agent.id, term=1)
+        db.complete_task(dep_b.id, sample_agent.id)
+
+        task = Task(id="task-x", title="Task X", depends_on=["dep-c", "dep-b", "dep-a"])
+        db.create_task(task)
+
+        blocking = db.get_blocking_dependencies(task)
+        assert [t.id for t in blocking] == ["dep-c", "dep-a"]
+
     def test_get_task_counts(self, db_with_tasks: Database):
         """Test getting task counts."""
         counts = db_with_tasks.get_task_counts()
@@ -194,69 +378,6 @@ class TestTaskOperations:
         assert counts["done"] == 0
 
 
-class TestLeaderOperations:
-    """Tests for leader election operations."""
-
-    def test_first_agent_becomes_leader(self, db: Database, sample_agent: Agent):
-        """Test first agent becomes leader."""
-        db.create_agent(sample_agent)
-
-        is_leader, term = db.try_become_leader(sample_agent.id)
-
-        assert is_leader is True
-        assert term == 1
-
-    def test_second_agent_not_leader(self, db: Database):
-        """Test second agent doesn't become leader while first holds lease."""
-        agent1 = Agent(id=generate_short_id(), name="agent-1")
-        agent2 = Agent(id=generate_short_id(), name="agent-2")
-
-        db.create_agent(agent1)
-        db.create_agent(agent2)
-
-        # First agent becomes leader
-        is_leader1, term1 = db.try_become_leader(agent1.id)
-        assert is_leader1 is True
-
-        # Second agent cannot become leader
-        is_leader2, term2 = db.try_become_leader(agent2.id)
-        assert is_leader2 is False
-        assert term2 == 0
-
-    def test_leader_renews_lease(self, db: Database, sample_agent: Agent):
-        """Test leader can renew their lease."""
-        db.create_agent(sample_agent)
-
-        # Become leader
-        is_leader1, term1 = db.try_become_leader(sample_agent.id)
-        assert is_leader1 is True
-
-        # Renew lease (should succeed with same term)
-        is_leader2, term2 = db.try_become_leader(sample_agent.id)
-        assert is_leader2 is True
-        assert term2 == term1
-
-    def test_get_leader(self, db: Database, sample_agent: Agent):
-        """Test getting current leader."""
-        db.create_agent(sample_agent)
-        db.try_become_leader(sample_agent.id)
-
-        leader = db.get_leader()
-        assert leader is not None
-        assert leader.agent_id == sample_agent.id
-        assert leader.term == 1
-
-    def test_get_current_term(self, db: Database, sample_agent: Agent):
-        """Test getting current term."""
-        # No leader yet
-        assert db.get_current_term() == 0
-
-        db.create_agent(sample_agent)
-        db.try_become_leader(sample_agent.id)
-
-        assert db.get_current_term() == 1
-
-
 class TestMessageOperations:
     """Tests for message operations."""
 
@@ -330,15 +451,67 @@ class TestEventLog:
         """Test filtering events."""
         db.create_agent(sample_agent)
 
-        db.log_event("event_a", agent_id=sample_agent.id)
-        db.log_event("event_b", agent_id=sample_agent.id)
-        db.log_event("event_a", agent_id=sample_agent.id)
+        db.log_events_bulk([
+            ("event_a", sample_agent.id, None, None),
+            ("event_b", sample_agent.id, None, {"n": 2}),
+            ("event_a", sample_agent.id, None, None),
+        ])
 
         events_a = db.get_events(event_type="event_a")
         assert len(events_a) == 2
 
         events_b = db.get_events(event_type="event_b")
         assert len(events_b) == 1
+        assert events_b[0].details == {"n": 2}
+
+    def test_archive_events(self, fresh_db: Database, sample_agent: Agent):
+        """Test old events move into per-month archive files."""
+        fresh_db.create_agent(sample_agent)
+        fresh_db.log_event("old_event", agent_id=sample_agent.id)
+        fresh_db.log_event("older_event", agent_id=sample_agent.id)
+        fresh_db.log_event("recent_event", agent_id=sample_agent.id)
+        fresh_db.conn.execute(
+            "UPDATE events SET timestamp = '2025-01-15T10:00:00' WHERE event_type = 'old_event'"
+        )
+        fresh_db.conn.execute(
+            "UPDATE events SET timestamp = '2024-12-31T23:59:59' WHERE event_type = 'older_event'"
+        )
+
+        archived = fresh_db.archive_events(datetime(2025, 2, 1))
+
+        assert archived == 2
+        live = {row["event_type"] for row in fresh_db.conn.execute("SELECT event_type FROM events")}
+        assert "recent_event" in live and "old_event" not in live
+
+        shard = sqlite3.connect(fresh_db.db_path.parent / "events_2025_01.db")
+        try:
+            rows = shard.execute("SELECT event_type FROM events").fetchall()
+        finally:
+            shard.close()
+        assert rows == [("old_event",)]
+        assert (fresh_db.db_path.parent / "events_2024_12.db").exists()
+
+        # Nothing left to archive
+        assert fresh_db.archive_events(datetime(2025, 2, 1)) == 0
+
+    def test_get_events_reads_archives(self, fresh_db: Database, sample_agent: Agent):
+        """Test archived months are read on request, newest first."""
+        fresh_db.create_agent(sample_agent)
+        for event_type in ("old_event", "older_event", "recent_event"):
+            fresh_db.log_event(event_type, agent_id=sample_agent.id)
+        fresh_db.conn.execute(
+            "UPDATE events SET timestamp = '2025-01-15T10:00:00' WHERE event_type = 'old_event'"
+        )
+        fresh_db.conn.execute(
+            "UPDATE events SET timestamp = '2024-12-31T23:59:59' WHERE event_type = 'older_event'"
+        )
+        fresh_db.archive_events(datetime(2025, 2, 1))
+
+        events = fresh_db.get_events(agent_id=sample_agent.id, include_archived=True)
+        assert [e.event_type for e in events][-2:] == ["old_event", "older_event"]
+
+        assert len(fresh_db.get_events(agent_id=sample_agent.id, limit=2, include_archived=True)) == 2
+        assert fresh_db.get_events(event_type="old_event") == []
 
 
 class TestCircularDependencyDetection:
@@ -441,3 +614,67 @@ class TestCircularDependencyDetection:
         # A depends on non-existent task - should not cause cycle
         result = db.would_create_cycle("task-a", ["nonexistent"])
         assert result is None
+
+
+class TestTransactions:
+    """Tests for transaction grouping."""
+
+    def test_mutation_and_event_commit_together(self, fresh_db: Database, sample_task: Task):
+        """Test a mutation and its audit event are rolled back as one unit."""
+        with pytest.raises(RuntimeError):
+            with fresh_db.transaction():
+                fresh_db.create_task(sample_task)
+                raise RuntimeError("boom")
+
+        assert fresh_db.get_task(sample_task.id) is None
+        assert fresh_db.get_events(event_type="task_created") == []
+
+    def test_nested_transaction_joins_outer(self, fresh_db: Database, sample_task: Task):
+        """Test nested transactions commit with the outermost one."""
+        with fresh_db.transaction() as conn:
+            fresh_db.create_task(sample_task)
+            assert conn.in_transaction
+
+        assert not fresh_db.conn.in_transaction
+        assert fresh_db.get_task(sample_task.id) is not None
+
+
+class TestConnectionSettings:
+    """Tests for per-connection SQLite tuning."""
+
+    def test_default_pragmas(self, db: Database):
+        """Test connections, including the one tests share, get the tuned settings."""
+        assert db.conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+        assert db.conn.execute("PRAGMA synchronous").fetchone()[0] == 1  # NORMAL
+        assert db.conn.execute("PRAGMA busy_timeout").fetchone()[0] == 5000
+        assert db.conn.execute("PRAGMA cache_size").fetchone()[0] == -65536
+        assert db.conn.execute("PRAGMA temp_store").fetchone()[0] == 2  # MEMORY
+        assert db.conn.execute("PRAGMA wal_autocheckpoint").fetchone()[0] == 2000
+
+    def test_env_overrides(self, temp_project, monkeypatch):
+        """Test operators can cap memory use through the environment."""
+        monkeypatch.setenv("AQUA_SQLITE_CACHE_KB", "2048")
+        monkeypatch.setenv("AQUA_SQLITE_WAL_AUTOCHECKPOINT", "500")
+
+        database = Database(temp_project / "tuned.db")
+        try:
+            assert database.conn.execute("PRAGMA cache_size").fetchone()[0] == -2048
+            assert database.conn.execute("PRAGMA wal_autocheckpoint").fetchone()[0] == 500
+        finally:
+            database.close()
+
+    def test_connection_per_thread(self, fresh_db: Database):
+        """Test each thread gets its own connection and close() shuts them all."""
+        main_conn = fresh_db.conn
+        assert fresh_db.conn is main_conn
+
+        other = []
+        thread = threading.Thread(target=lambda: other.append(fresh_db.conn))
+        thread.start()
+        thread.join()
+        assert other[0] is not main_conn
+
+        fresh_db.close()
+        with pytest.raises(sqlite3.ProgrammingError):
+            other[0].execute("SELECT 1")
+        assert fresh_db.conn is not main_conn
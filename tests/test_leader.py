@@ -1,13 +1,16 @@
 """Tests for leader election."""
 
 import pytest
-from datetime import datetime, timedelta
 import threading
 import time
+from concurrent.futures import ThreadPoolExecutor
 
 from aqua.db import Database
-from aqua.models import Agent
-from aqua.utils import generate_short_id
+from aqua.models import Agent, Task
+from aqua.utils import generate_short_id, utc_now_naive
+
+# Puts a claimed task back in the queue without going through abandon
+_RESET_TASK_SQL = "UPDATE tasks SET status = 'pending', claimed_by = NULL WHERE id = ?"
 
 
 class TestLeaderElection:
@@ -62,7 +65,7 @@ class TestLeaderElection:
         # Lease should be extended
         assert leader_after.lease_expires_at > leader_before.lease_expires_at
 
-    def test_takeover_after_lease_expiry(self, db: Database):
+    def test_takeover_after_lease_expiry(self, db: Database, fake_clock):
         """New agent can become leader after lease expires."""
         agent1 = Agent(id=generate_short_id(), name="agent-1")
         agent2 = Agent(id=generate_short_id(), name="agent-2")
@@ -73,34 +76,78 @@ class TestLeaderElection:
         # First agent becomes leader
         db.try_become_leader(agent1.id, lease_seconds=1)
 
-        # Wait for lease to expire
-        time.sleep(1.5)
+        # Let the lease expire
+        fake_clock.advance(1.5)
 
         # Second agent can now become leader
         is_leader, term = db.try_become_leader(agent2.id)
         assert is_leader is True
         assert term == 2  # New term
 
-    def test_term_increments_on_new_leader(self, db: Database):
+    def test_takeover_logs_previous_leader(self, db: Database):
+        """Takeover is logged with the leader it replaced."""
+        agent1 = Agent(id=generate_short_id(), name="agent-1")
+        agent2 = Agent(id=generate_short_id(), name="agent-2")
+
+        db.create_agent(agent1)
+        db.create_agent(agent2)
+
+        # A zero-length lease is already expired by the next attempt
+        db.try_become_leader(agent1.id, lease_seconds=0)
+        is_leader, term = db.try_become_leader(agent2.id)
+        assert is_leader is True
+        assert term == 2
+
+        event = db.get_events(event_type="leader_elected", limit=1)[0]
+        assert event.agent_id == agent2.id
+        assert event.details["reason"] == "lease_expired"
+        assert event.details["previous_leader"] == agent1.id
+
+    def test_takeover_previous_leader_without_events(self, db: Database):
+        """The replaced leader comes from the leader row, not the audit log."""
+        agent1 = Agent(id=generate_short_id(), name="agent-1")
+        agent2 = Agent(id=generate_short_id(), name="agent-2")
+
+        db.create_agent(agent1)
+        db.create_agent(agent2)
+
+        db.try_become_leader(agent1.id, lease_seconds=0)
+        # As if the first election had been archived away
+        db.conn.execute("DELETE FROM events")
+        db.try_become_leader(agent2.id)
+
+        event = db.get_events(event_type="leader_elected", limit=1)[0]
+        assert event.details["previous_leader"] == agent1.id
+
+    def test_renewal_on_same_tick_is_not_an_election(self, db: Database, fake_clock):
+        """A renewal stamped with the election time is not logged again."""
+        agent = Agent(id=generate_short_id(), name="agent-1")
+        db.create_agent(agent)
+
+        assert db.try_become_leader(agent.id) == (True, 1)
+        assert db.try_become_leader(agent.id) == (True, 1)
+
+        assert len(db.get_events(event_type="leader_elected")) == 1
+
+    def test_term_increments_on_new_leader(self, db: Database, fake_clock):
         """Term number increments with each new leader."""
         agents = [
             Agent(id=generate_short_id(), name=f"agent-{i}")
             for i in range(3)
         ]
-        for agent in agents:
-            db.create_agent(agent)
+        db.create_agents_bulk(agents)
 
         # First leader
         _, term1 = db.try_become_leader(agents[0].id, lease_seconds=1)
         assert term1 == 1
 
-        time.sleep(1.1)
+        fake_clock.advance(1.1)
 
         # Second leader
         _, term2 = db.try_become_leader(agents[1].id, lease_seconds=1)
         assert term2 == 2
 
-        time.sleep(1.1)
+        fake_clock.advance(1.1)
 
         # Third leader
         _, term3 = db.try_become_leader(agents[2].id, lease_seconds=1)
@@ -117,9 +164,9 @@ class TestLeaderElection:
         assert leader is not None
         assert leader.agent_id == agent.id
         assert leader.term == 1
-        assert leader.lease_expires_at > datetime.utcnow()
+        assert leader.lease_expires_at > utc_now_naive()
 
-    def test_leader_is_expired(self, db: Database):
+    def test_leader_is_expired(self, db: Database, fake_clock):
         """Test checking if leader lease is expired."""
         agent = Agent(id=generate_short_id(), name="agent-1")
         db.create_agent(agent)
@@ -127,46 +174,51 @@ class TestLeaderElection:
         db.try_become_leader(agent.id, lease_seconds=1)
 
         leader = db.get_leader()
-        assert leader.is_expired() is False
+        assert leader.is_expired(fake_clock.now) is False
 
-        time.sleep(1.1)
+        fake_clock.advance(1.1)
 
         leader = db.get_leader()
-        assert leader.is_expired() is True
+        assert leader.is_expired(fake_clock.now) is True
 
-    def test_concurrent_election(self, db: Database):
+    @pytest.mark.slow
+    def test_lease_expires_in_real_time(self, db: Database):
+        """Test lease expiry against the real clock rather than fake_clock."""
+        agent1 = Agent(id=generate_short_id(), name="agent-1")
+        agent2 = Agent(id=generate_short_id(), name="agent-2")
+
+        db.create_agent(agent1)
+        db.create_agent(agent2)
+
+        db.try_become_leader(agent1.id, lease_seconds=1)
+        assert db.get_leader().is_expired() is False
+
+        time.sleep(1.1)
+
+        assert db.get_leader().is_expired() is True
+        is_leader, term = db.try_become_leader(agent2.id)
+        assert is_leader is True
+        assert term == 2
+
+    def test_concurrent_election(self, fresh_db: Database):
         """Test that only one agent wins in concurrent election."""
         agents = [
             Agent(id=generate_short_id(), name=f"agent-{i}")
             for i in range(5)
         ]
-        for agent in agents:
-            db.create_agent(agent)
+        fresh_db.create_agents_bulk(agents)
 
-        results = []
-        lock = threading.Lock()
+        barrier = threading.Barrier(len(agents), timeout=10)
 
         def try_election(agent_id):
-            # Each thread needs its own connection
-            from aqua.db import get_db
-            from pathlib import Path
-
-            thread_db = Database(db.db_path)
-            is_leader, term = thread_db.try_become_leader(agent_id)
-            with lock:
-                results.append((agent_id, is_leader, term))
-            thread_db.close()
-
-        threads = [
-            threading.Thread(target=try_election, args=(agent.id,))
-            for agent in agents
-        ]
+            # Database keeps one connection per thread; open it before the race
+            fresh_db.conn
+            barrier.wait()
+            is_leader, term = fresh_db.try_become_leader(agent_id)
+            return (agent_id, is_leader, term)
 
-        # Start all threads nearly simultaneously
-        for t in threads:
-            t.start()
-        for t in threads:
-            t.join()
+        with ThreadPoolExecutor(max_workers=len(agents)) as pool:
+            results = list(pool.map(try_election, [a.id for a in agents]))
 
         # Exactly one should be leader
         leaders = [r for r in results if r[1] is True]
@@ -175,7 +227,7 @@ class TestLeaderElection:
         # All leaders should have term 1
         assert leaders[0][2] == 1
 
-    def test_fencing_token_prevents_stale_leader(self, db: Database):
+    def test_fencing_token_prevents_stale_leader(self, db: Database, fake_clock):
         """Test that fencing tokens prevent stale leader operations."""
         agent1 = Agent(id=generate_short_id(), name="agent-1")
         agent2 = Agent(id=generate_short_id(), name="agent-2")
@@ -188,7 +240,6 @@ class TestLeaderElection:
         term1 = db.get_current_term()
 
         # Create a task
-        from aqua.models import Task
         task = Task(id=generate_short_id(), title="Test task")
         db.create_task(task)
 
@@ -197,16 +248,13 @@ class TestLeaderElection:
         assert success1 is True
 
         # Simulate lease expiry and new leader
-        time.sleep(1.1)
+        fake_clock.advance(1.1)
         db.try_become_leader(agent2.id)
         term2 = db.get_current_term()
         assert term2 == 2
 
         # Reset task for test
-        db.conn.execute(
-            "UPDATE tasks SET status = 'pending', claimed_by = NULL WHERE id = ?",
-            (task.id,)
-        )
+        db.conn.execute(_RESET_TASK_SQL, (task.id,))
 
         # Old term should still work for claiming (fencing is for verification)
         # But the claim_term will be recorded for audit
@@ -0,0 +1,85 @@
+"""Tests for data models."""
+
+from dataclasses import FrozenInstanceError, fields
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from aqua.models import Agent, Event, Leader, Message, Task
+from aqua.utils import batch_now
+
+NOW = datetime(2025, 1, 1, 12, 0, 0)
+
+SAMPLES = [
+    Agent(id="a1", name="agent-1"),
+    Task(id="t1", title="Task"),
+    Message(id=1, from_agent="a1", to_agent=None, content="hi"),
+    Leader(agent_id="a1", term=1, lease_expires_at=NOW, elected_at=NOW),
+    Event(id=1, timestamp=NOW, event_type="test", agent_id=None, task_id=None),
+]
+
+
+class TestSerialization:
+    """Tests for model to_dict/from_row conversion."""
+
+    @pytest.mark.parametrize("instance", SAMPLES, ids=lambda m: type(m).__name__)
+    def test_to_dict_covers_every_field(self, instance):
+        """Test the hand-written to_dict stays in sync with the dataclass fields."""
+        public = [f.name for f in fields(instance) if not f.name.startswith("_")]
+        assert list(instance.to_dict()) == public
+
+    def test_to_dict_keeps_timezone_offsets(self):
+        """Test equal instants in different zones keep their own offsets."""
+        utc = datetime(2025, 1, 1, 12, 0, tzinfo=timezone.utc)
+        plus_one = utc.astimezone(timezone(timedelta(hours=1)))
+
+        assert Task(id="t1", title="A", created_at=utc).to_dict()["created_at"].endswith("+00:00")
+        assert Task(id="t2", title="B", created_at=plus_one).to_dict()["created_at"].endswith("+01:00")
+
+
+class TestDefaults:
+    """Tests for default field values."""
+
+    def test_empty_containers_are_not_shared(self):
+        """Test each instance gets its own mutable default containers."""
+        first, second = Task(id="t1", title="A"), Task(id="t2", title="B")
+        first.tags.append("backend")
+        first.depends_on.append("t0")
+
+        assert second.tags == [] and second.depends_on == []
+        assert Agent(id="a1", name="x").metadata is not Agent(id="a2", name="y").metadata
+
+
+class TestLeader:
+    """Tests for Leader lease checks."""
+
+    def test_is_expired(self):
+        """Test lease expiry compares naive UTC timestamps correctly."""
+        now = datetime.now(timezone.utc).replace(tzinfo=None)
+        live = Leader(agent_id="a1", term=1, lease_expires_at=now + timedelta(seconds=30), elected_at=now)
+        dead = Leader(agent_id="a1", term=1, lease_expires_at=now - timedelta(seconds=1), elected_at=now)
+
+        assert live.is_expired() is False
+        assert dead.is_expired() is True
+
+    def test_lease_cannot_be_reassigned(self):
+        """Test Leader is frozen, so is_expired cannot go stale."""
+        leader = Leader(agent_id="a1", term=1, lease_expires_at=NOW, elected_at=NOW)
+        with pytest.raises(FrozenInstanceError):
+            leader.lease_expires_at = NOW + timedelta(days=1)
+
+
+class TestBatchNow:
+    """Tests for batch-pinned default timestamps."""
+
+    def test_models_share_pinned_timestamp(self):
+        """Test models built in a batch share one timestamp, and others do not."""
+        with batch_now() as pinned:
+            tasks = [Task(id=f"t{i}", title="Task") for i in range(3)]
+            agent = Agent(id="a1", name="agent-1")
+            with batch_now() as nested:
+                assert nested is pinned
+
+        assert all(t.created_at is pinned and t.updated_at is pinned for t in tasks)
+        assert agent.registered_at is pinned
+        assert Task(id="t9", title="Later").created_at is not pinned
@@ -0,0 +1,94 @@
+"""Tests for utility helpers."""
+
+import json
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import pytest
+
+from aqua import utils
+from aqua.models import Agent, AgentStatus
+from aqua.utils import format_time_ago, format_times_ago, json_dumps, parse_tags, utc_now
+
+
+class TestFormatTimeAgo:
+    """Tests for relative time formatting."""
+
+    @pytest.mark.parametrize("seconds, expected", [
+        (0, "0s ago"),
+        (59, "59s ago"),
+        (60, "1m ago"),
+        (3599, "59m ago"),
+        (3600, "1h ago"),
+        (86399, "23h ago"),
+        (86400, "1d ago"),
+        (10 * 86400, "10d ago"),
+    ])
+    def test_bucket_boundaries(self, seconds, expected):
+        """Test each unit starts exactly at its threshold."""
+        now = utc_now().replace(tzinfo=None)
+        assert format_time_ago(now - timedelta(seconds=seconds, milliseconds=100)) == expected
+
+    def test_future(self):
+        """Test timestamps ahead of now."""
+        assert format_time_ago(utc_now() + timedelta(minutes=1)) == "in the future"
+
+    def test_batch_matches_single(self):
+        """Test the batch formatter handles naive and aware datetimes alike."""
+        now = utc_now()
+        dts = [now - timedelta(seconds=5), now.replace(tzinfo=None) - timedelta(hours=2)]
+        assert format_times_ago(dts) == ["5s ago", "2h ago"]
+        assert format_times_ago([]) == []
+
+
+@pytest.fixture(params=["orjson", "json"])
+def json_backend(request, monkeypatch):
+    """Run a test with orjson (when installed) and with the stdlib fallback."""
+    if request.param == "json":
+        monkeypatch.setattr(utils, "orjson", None)
+    elif utils.orjson is None:
+        pytest.skip("orjson not installed")
+    return request.param
+
+
+class TestJsonDumps:
+    """Tests for JSON serialization."""
+
+    def test_backends_agree_on_fallback_types(self, json_backend):
+        """Test datetimes and dataclasses reach `default` on both backends."""
+        data = {"at": datetime(2025, 1, 1, 12, 0), "agent": Agent(id="a1", name="x")}
+        assert json.loads(json_dumps(data, default=str)) == {
+            "at": "2025-01-01 12:00:00",
+            "agent": str(data["agent"]),
+        }
+        with pytest.raises(TypeError):
+            json_dumps({"at": datetime(2025, 1, 1)})
+
+    def test_enums_encode_by_value(self, json_backend):
+        """Test enums serialize to their value on both backends."""
+        assert json.loads(json_dumps({"status": AgentStatus.ACTIVE})) == {"status": "active"}
+
+    def test_default_and_non_string_keys(self, json_backend):
+        """Test unknown types fall back to default and int keys become strings."""
+        data = {"path": Path("a/b"), 1: "int key"}
+        decoded = json.loads(json_dumps(data, default=str))
+        assert decoded == {"path": "a/b", "1": "int key"}
+
+    def test_indent(self, json_backend):
+        """Test indented output spans lines and compact output does not."""
+        assert "\n" in json_dumps({"a": [1, 2]}, indent=True)
+        assert "\n" not in json_dumps({"a": [1, 2]})
+
+
+class TestParseTags:
+    """Tests for comma-separated tag parsing."""
+
+    @pytest.mark.parametrize("raw, expected", [
+        (None, []),
+        ("", []),
+        ("backend", ["backend"]),
+        (" api , backend,, ,db ", ["api", "backend", "db"]),
+    ])
+    def test_parse_tags(self, raw, expected):
+        """Test whitespace is trimmed and empty entries are dropped."""
+        assert parse_tags(raw) == expected